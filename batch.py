@@ -0,0 +1,85 @@
+import copy
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def process_tape(pipeline, raw_path, output_path):
+    """
+    Run the full extract/clean/calculate/rename chain on one tape.
+
+    Args:
+        pipeline (DataPipeline): Pipeline with its formulas already converted.
+        raw_path (str): Path of the raw CSV file.
+        output_path (str): Path of the output CSV file.
+
+    Returns:
+        tuple: The output path, and the pipeline's Instrumentation (None when not
+        instrumented) so a worker process can send its records back.
+    """
+    return pipeline.process_file(raw_path, output_path), pipeline.instrumentation
+
+
+class BatchProcessor:
+    def __init__(self, pipeline, max_workers=None):
+        """
+        Initialize the BatchProcessor class.
+
+        Args:
+            pipeline (DataPipeline): Pipeline holding the standard and calculations files.
+            max_workers (int): Number of worker processes, defaults to the number of cores.
+        """
+        self.pipeline = pipeline
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def run(self, jobs):
+        """
+        Process many tapes, fanning them out across a process pool.
+
+        Formulas are converted once in the parent process and shared with every
+        worker, so a batch never repeats the conversion per tape.
+
+        Args:
+            jobs (list): List of (raw_path, output_path) tuples.
+
+        Returns:
+            tuple: A dict of raw path to output path for the tapes that succeeded,
+            and a dict of raw path to error traceback for the tapes that failed.
+        """
+        self.pipeline.convert_formulas()
+        # Workers only need the converted formulas, not the converter and its API client
+        worker_pipeline = copy.copy(self.pipeline)
+        worker_pipeline.converter = None
+        worker_pipeline.calculations_df = None
+
+        results = {}
+        errors = {}
+        if self.max_workers == 1 or len(jobs) == 1:
+            for raw_path, output_path in jobs:
+                try:
+                    results[raw_path], _ = process_tape(worker_pipeline, raw_path, output_path)
+                except Exception:
+                    errors[raw_path] = traceback.format_exc()
+            return results, errors
+
+        instrumentation = self.pipeline.instrumentation
+        if instrumentation is not None:
+            # Each worker records into a fresh copy, merged back as its tapes finish
+            worker_pipeline.instrumentation = copy.copy(instrumentation)
+            worker_pipeline.instrumentation.clear()
+
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            futures = {
+                executor.submit(process_tape, worker_pipeline, raw_path, output_path): raw_path
+                for raw_path, output_path in jobs
+            }
+            for future in as_completed(futures):
+                raw_path = futures[future]
+                try:
+                    results[raw_path], worker_instrumentation = future.result()
+                    if instrumentation is not None:
+                        instrumentation.merge(worker_instrumentation)
+                except Exception:
+                    errors[raw_path] = traceback.format_exc()
+
+        return results, errors
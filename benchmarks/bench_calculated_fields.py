@@ -0,0 +1,100 @@
+"""
+Benchmark row-wise apply against whole-column execution of calculated fields.
+
+Runs HardcodeColumns.process_values on frames the size of calculated_data.csv
+(and larger multiples of it) with two versions of the same formulas: the
+row-wise `df_mapped.apply(..., axis=1)` code the LLM prompt produces, and
+the column-wise code FormulaCompiler produces.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_calculated_fields --scales 1 10
+"""
+import argparse
+import time
+import pandas as pd
+from formula_compiler import FormulaCompiler
+from hardcoded_fields import HardcodeColumns
+
+
+EXPRESSIONS = {
+    'Eligibility Flag': 'IF(OR(MaxArrears > 6, OutstandingBalance=0),"Ineligible","Eligible")',
+    'Arrears Bucket': 'IF(MaxArrears = 0, "Current", IF(MaxArrears <= 3, "Early", "Late"))',
+    'Balance Paid': 'IF(OPB > 0, TotalCapitalPaid / OPB, 0)',
+    'Active High Score': 'AND(LoanStatus = "Active", CreditScore >= 500)',
+}
+
+ROWWISE_CODE = {
+    'Eligibility Flag': '''def check_eligibility(row):
+    if row['MaxArrears'] > 6 or row['OutstandingBalance'] == 0:
+        return "Ineligible"
+    else:
+        return "Eligible"
+
+result = df_mapped.apply(check_eligibility, axis=1)''',
+    'Arrears Bucket': '''def arrears_bucket(row):
+    if row['MaxArrears'] == 0:
+        return "Current"
+    elif row['MaxArrears'] <= 3:
+        return "Early"
+    else:
+        return "Late"
+
+result = df_mapped.apply(arrears_bucket, axis=1)''',
+    'Balance Paid': '''def balance_paid(row):
+    if row['OPB'] > 0:
+        return row['TotalCapitalPaid'] / row['OPB']
+    else:
+        return 0
+
+result = df_mapped.apply(balance_paid, axis=1)''',
+    'Active High Score': '''def active_high_score(row):
+    return row['LoanStatus'] == "Active" and row['CreditScore'] >= 500
+
+result = df_mapped.apply(active_high_score, axis=1)''',
+}
+
+
+def load_frame(path, scale):
+    df = pd.read_csv(path).rename(columns={'Credit Score': 'CreditScore'})
+    df = df.drop(columns=[column for column in EXPRESSIONS if column in df.columns])
+    if scale > 1:
+        df = pd.concat([df] * scale, ignore_index=True)
+    return df
+
+
+def time_process_values(df, formulas_dict, repeat):
+    data_dict = {key: 'Calculation' for key in formulas_dict}
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        frame = df.copy()
+        start = time.perf_counter()
+        result = HardcodeColumns().process_values(data_dict, frame, formulas_dict)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default='calculated_data.csv')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    compiler = FormulaCompiler()
+    vectorized_code = {key: compiler.compile(expression) for key, expression in EXPRESSIONS.items()}
+
+    print(f"{'rows':>10} {'apply (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for scale in args.scales:
+        df = load_frame(args.data, scale)
+        rowwise_time, rowwise = time_process_values(df, ROWWISE_CODE, args.repeat)
+        vectorized_time, vectorized = time_process_values(df, vectorized_code, args.repeat)
+        for key in EXPRESSIONS:
+            if not (pd.Series(rowwise[key]).astype(str) == pd.Series(vectorized[key]).astype(str)).all():
+                raise AssertionError(f"Results differ for {key}")
+        print(f"{len(df):>10} {rowwise_time:>12.3f} {vectorized_time:>15.4f} {rowwise_time / vectorized_time:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Measure the memory of the hardcoded and null standard fields.
+
+Generates synthetic tapes with benchmarks.tapes, cleans them, and runs the
+calculate stage with the hardcoded fields stored three ways, reporting the
+memory they take in the frame handed to the rename stage:
+
+- broadcast: the value assigned to every row, as the calculate stage used to
+- categorical: a single-category Categorical per field (HardcodeColumns.process_values
+  without ConstantColumns)
+- lazy: kept in ConstantColumns until the output is written (DataPipeline)
+
+Fields read by a formula are assigned to every row in all modes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_constants --lenders verdam carmoola --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from benchmarks.bench_pipeline import StubClient
+from benchmarks.tapes import generate_tapes
+from calculations import FormulaConverter
+from cleanings import DataCleaner
+from constant_columns import ConstantColumns
+from flter_columns import ColumnExtractor
+from hardcoded_fields import HardcodeColumns
+from pipeline import DataPipeline, CONVERSION_RATES
+
+
+def broadcast_values(data_dict, df_mapped, formulas_dict):
+    """The calculate stage as it used to assign hardcoded and null fields."""
+    for key, value in data_dict.items():
+        if value != 'Calculation':
+            df_mapped[key] = np.nan if value == '-' else value
+    return HardcodeColumns().process_values(
+        {key: value for key, value in data_dict.items() if value == 'Calculation'}, df_mapped, formulas_dict
+    )
+
+
+def measure(cleaned, filtered_dict, formulas_dict, mode):
+    """Return the bytes taken by the hardcoded fields in the calculated frame."""
+    df = cleaned.copy()
+    if mode == 'broadcast':
+        df = broadcast_values(filtered_dict, df, formulas_dict)
+    elif mode == 'categorical':
+        df = HardcodeColumns().process_values(filtered_dict, df, formulas_dict)
+    else:
+        df = HardcodeColumns().process_values(filtered_dict, df, formulas_dict, constants=ConstantColumns())
+    hardcoded = [key for key, value in filtered_dict.items() if value != 'Calculation' and key in df.columns]
+    return df[hardcoded].memory_usage(deep=True, index=False).sum()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lenders', nargs='+', default=['verdam', 'carmoola', 'liberisUSPortfolio'])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    print(f"{'lender':>20} {'fields':>7} {'mode':>12} {'memory (MiB)':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for lender in args.lenders:
+            tapes = generate_tapes(lender, args.rows, directory)
+            standard_df = pd.read_csv(tapes.standard_path)
+            converter = FormulaConverter(use_cache=False, client=StubClient(tapes.llm_code))
+            formulas_dict = DataPipeline(standard_df, pd.read_csv(tapes.calculations_path),
+                                         converter=converter).convert_formulas()
+            file_name = os.path.basename(tapes.raw_path)
+            raw_df = ColumnExtractor.read_useful_columns(tapes.raw_path, file_name)
+            useful, filtered_dict = ColumnExtractor(raw_df, standard_df, None).get_useful_columns(file_name)
+            cleaned = DataCleaner(useful).clean_data(CONVERSION_RATES)
+            fields = sum(value != 'Calculation' for value in filtered_dict.values())
+            for mode in ('broadcast', 'categorical', 'lazy'):
+                memory = measure(cleaned, filtered_dict, formulas_dict, mode)
+                print(f"{tapes.lender:>20} {fields:>7} {mode:>12} {memory / 2 ** 20:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark writing and loading the mapped output as CSV, Parquet and Feather.
+
+Uses calculated_data.csv at 1x and 10x its row count, serializes it in
+memory with DataFrameExporter (as the Streamlit download does) and times
+loading it back, which is what downstream analytics pays on every read.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_export --scales 1 10
+"""
+import argparse
+import io
+import time
+import pandas as pd
+from exporters import DataFrameExporter, EXPORT_FORMATS
+
+
+READERS = {'csv': pd.read_csv, 'parquet': pd.read_parquet, 'feather': pd.read_feather}
+
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default='calculated_data.csv')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    base = pd.read_csv(args.data)
+    print(f"{'rows':>10} {'format':>8} {'size (KB)':>10} {'write (s)':>10} {'load (s)':>10}")
+    for scale in args.scales:
+        df = pd.concat([base] * scale, ignore_index=True) if scale > 1 else base
+        for fmt in EXPORT_FORMATS:
+            exporter = DataFrameExporter(fmt)
+            data = exporter.to_bytes(df)
+            write_time = best_time(lambda: exporter.to_bytes(df), args.repeat)
+            load_time = best_time(lambda: READERS[fmt](io.BytesIO(data)), args.repeat)
+            print(f"{len(df):>10} {fmt:>8} {len(data) / 1024:>10.0f} {write_time:>10.3f} {load_time:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark the default C CSV engine against the pyarrow engine.
+
+Builds a raw-tape-like file from calculated_data.csv (currency symbols on
+the money columns, percent signs on the rate column) at 1x and 10x its row
+count, then times reading it and reading plus DataCleaner.clean_data with
+both engines.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ingest --scales 1 10
+"""
+import argparse
+import os
+import tempfile
+import time
+import pandas as pd
+from cleanings import DataCleaner
+from pipeline import CONVERSION_RATES
+
+
+MONEY_COLUMNS = ['OutstandingBalance', 'TotalCapitalPaid', 'MonthlyPayment']
+PERCENT_COLUMNS = ['APR/Interest Rate']
+
+
+def write_tape(data_path, scale, directory):
+    df = pd.read_csv(data_path)
+    if scale > 1:
+        df = pd.concat([df] * scale, ignore_index=True)
+    for column in MONEY_COLUMNS:
+        df[column] = '£' + df[column].map('{:,.2f}'.format)
+    for column in PERCENT_COLUMNS:
+        df[column] = df[column].astype(str) + '%'
+    path = os.path.join(directory, f"tape_x{scale}.csv")
+    df.to_csv(path, index=False)
+    return path, len(df)
+
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def read(path, engine):
+    if engine == 'pyarrow':
+        return pd.read_csv(path, engine='pyarrow', dtype_backend='pyarrow')
+    return pd.read_csv(path)
+
+
+def read_and_clean(path, engine):
+    return DataCleaner(read(path, engine)).clean_data(CONVERSION_RATES)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default='calculated_data.csv')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10} {'engine':>8} {'read (s)':>10} {'read+clean (s)':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales:
+            path, rows = write_tape(args.data, scale, directory)
+            for engine in ('c', 'pyarrow'):
+                read_time = best_time(lambda: read(path, engine), args.repeat)
+                clean_time = best_time(lambda: read_and_clean(path, engine), args.repeat)
+                print(f"{rows:>10} {engine:>8} {read_time:>10.3f} {clean_time:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
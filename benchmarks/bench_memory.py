@@ -0,0 +1,123 @@
+"""
+Measure the peak memory of the pipeline stages with and without frame copies.
+
+Generates a synthetic verdam tape (1M rows by default) with benchmarks.tapes,
+then runs the extract/clean/calculate/rename stages in a fresh process per
+mode. Each run samples the process RSS while the stages run, after the tape
+has been read:
+
+- copies: the chain as it used to run; the extracted columns are a separate
+  frame and clean_data returns a copy of the cleaned frame
+- context: DataPipeline.run_stages on the tape it read (as process_file runs it),
+  where PipelineContext passes one working frame through the stages
+
+Run from the repository root:
+
+    python -m benchmarks.bench_memory --rows 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import pandas as pd
+import psutil
+from benchmarks.tapes import generate_tapes
+from cleanings import DataCleaner
+from flter_columns import ColumnExtractor
+from hardcoded_fields import HardcodeColumns
+from mapping import DataFrameColumnRenamer
+from pipeline import DataPipeline, CONVERSION_RATES
+
+
+class RssSampler:
+    """Sample the process RSS on a background thread and keep the highest value."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = self.process.memory_info().rss
+        self.running = False
+
+    def sample(self):
+        while self.running:
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.running = False
+        self.thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+def run_with_copies(pipeline, raw_df, file_name):
+    extractor = ColumnExtractor(raw_df, pipeline.standard_df, None)
+    # get_useful_columns selects the columns into a new frame
+    useful_columns_data, filtered_dict = extractor.get_useful_columns(file_name)
+    cleaned_columns_data = DataCleaner(useful_columns_data).clean_data(CONVERSION_RATES)
+    calculated_df = HardcodeColumns().process_values(filtered_dict, cleaned_columns_data, pipeline.convert_formulas())
+    return DataFrameColumnRenamer(calculated_df, pipeline.standard_df).rename_columns()
+
+
+def measure(mode, raw_path, standard_path, calculations_path):
+    """Run one mode in this process and return its memory figures in bytes."""
+    pipeline = DataPipeline(pd.read_csv(standard_path), pd.read_csv(calculations_path))
+    pipeline.convert_formulas()
+    file_name = os.path.basename(raw_path)
+    raw_df = ColumnExtractor.read_useful_columns(raw_path, file_name)
+    baseline = psutil.Process().memory_info().rss
+    with RssSampler() as sampler:
+        if mode == 'copies':
+            df_mapped = run_with_copies(pipeline, raw_df, file_name)
+        else:
+            df_mapped, _, constants = pipeline.run_stages(raw_df, file_name, copy=False)
+            df_mapped = constants.expand(df_mapped)
+    return {'mode': mode, 'rows': len(df_mapped), 'after_read': baseline, 'peak': sampler.peak}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--lender', default='verdam')
+    parser.add_argument('--data-dir', default=None, help="Keep the generated tape here and reuse it.")
+    parser.add_argument('--measure', nargs=4, metavar=('MODE', 'RAW', 'STANDARD', 'CALCULATIONS'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        # Child process: one mode, reported as JSON on stdout
+        print(json.dumps(measure(*args.measure)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        tapes = generate_tapes(args.lender, args.rows, args.data_dir or directory, reuse=args.data_dir is not None)
+        # The stub-free calculations only hold expressions FormulaCompiler handles
+        calculations = pd.read_csv(tapes.calculations_path)
+        calculations = calculations[~calculations['Calculations'].isin(list(tapes.llm_code))]
+        calculations_path = os.path.join(directory, 'calculations.csv')
+        calculations.to_csv(calculations_path, index=False)
+
+        print(f"{'mode':>8} {'rows':>10} {'after read (MiB)':>17} {'peak (MiB)':>11} {'stages (MiB)':>13}")
+        for mode in ('copies', 'context'):
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_memory', '--measure', mode,
+                 tapes.raw_path, tapes.standard_path, calculations_path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            mib = 2 ** 20
+            print(f"{mode:>8} {result['rows']:>10} {result['after_read'] / mib:>17.0f} {result['peak'] / mib:>11.0f} "
+                  f"{(result['peak'] - result['after_read']) / mib:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Time every pipeline stage on synthetic lender tapes, offline.
+
+Generates raw, standard and calculations triples with benchmarks.tapes and
+runs DataPipeline.process_file on each with Instrumentation. The LLM is
+replaced by a stub client returning canned code, so the run needs no API
+key and the formula conversion costs the same every time.
+
+Save a run with --save and compare later runs with --baseline; any stage
+slower than the baseline by more than --tolerance is reported as a regression
+and the exit status is 1.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline --lenders verdam carmoola --rows 10000 100000 --save baseline.json
+    python -m benchmarks.bench_pipeline --lenders verdam carmoola --rows 10000 100000 --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import pandas as pd
+from benchmarks.tapes import generate_tapes
+from calculations import FormulaConverter
+from instrumentation import Instrumentation
+from pipeline import DataPipeline
+
+
+class StubChatCompletion:
+    def __init__(self, llm_code):
+        """
+        Initialize the StubChatCompletion class, a stand-in for openai.ChatCompletion.
+
+        Args:
+            llm_code (dict): Python code to return for each spreadsheet expression.
+        """
+        self.llm_code = llm_code
+
+    def create(self, model, messages):
+        expression = messages[-1]['content'].rsplit('\n', 1)[-1].strip()
+        code = self.llm_code.get(expression, "result = 'N/A'")
+        return {'choices': [{'message': {'content': code}}]}
+
+
+class StubClient:
+    """Client exposing ChatCompletion.create like the openai module, without network calls."""
+
+    def __init__(self, llm_code):
+        self.ChatCompletion = StubChatCompletion(llm_code)
+
+
+def run_tapes(tapes, chunksize=None, engine=None, output_format='csv', directory=None):
+    """
+    Run the pipeline on one generated triple.
+
+    Args:
+        tapes (TapeSet): The generated files.
+        chunksize (int): Rows per chunk, or None to load the tape whole.
+        engine (str): CSV parser engine.
+        output_format (str): Extension of the output file, e.g. 'csv' or 'parquet'.
+        directory (str): Directory for the output file.
+
+    Returns:
+        dict: The instrumentation report.
+    """
+    converter = FormulaConverter(use_cache=False, client=StubClient(tapes.llm_code))
+    instrumentation = Instrumentation()
+    pipeline = DataPipeline(pd.read_csv(tapes.standard_path), pd.read_csv(tapes.calculations_path),
+                            converter=converter, chunksize=chunksize, engine=engine,
+                            instrumentation=instrumentation)
+    output_path = os.path.join(directory, f"{tapes.lender}_mapped.{output_format}")
+    pipeline.process_file(tapes.raw_path, output_path)
+    return instrumentation.report()
+
+
+def compare(results, baseline, tolerance):
+    """
+    Find the stages slower than in the baseline.
+
+    Args:
+        results (dict): Stage times keyed on '<lender>/<rows>' then stage name.
+        baseline (dict): Results of an earlier run, in the same layout.
+        tolerance (float): Allowed slowdown ratio, e.g. 1.25 for 25%.
+
+    Returns:
+        list: (run, stage, baseline seconds, current seconds) for each regression.
+    """
+    regressions = []
+    for run, stages in results.items():
+        for stage, seconds in stages.items():
+            previous = baseline.get(run, {}).get(stage)
+            # Stages under 10ms are too noisy to compare
+            if previous and max(previous, seconds) >= 0.01 and seconds > previous * tolerance:
+                regressions.append((run, stage, previous, seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lenders', nargs='+', default=['verdam', 'carmoola', 'liberisUSPortfolio'])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000])
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per tape; the fastest time per stage is kept.")
+    parser.add_argument('--chunksize', type=int, default=None)
+    parser.add_argument('--engine', choices=['c', 'pyarrow'], default=None)
+    parser.add_argument('--format', default='csv', choices=['csv', 'parquet', 'feather'])
+    parser.add_argument('--data-dir', default=None, help="Keep the generated tapes here instead of a temporary directory.")
+    parser.add_argument('--save', default=None, help="Write the stage times to this JSON file.")
+    parser.add_argument('--baseline', default=None, help="Compare against stage times saved with --save.")
+    parser.add_argument('--tolerance', type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir = args.data_dir or directory
+        print(f"{'lender':>20} {'rows':>10} {'stage':>16} {'wall (s)':>10} {'cpu (s)':>10}")
+        for rows in args.rows:
+            for lender in args.lenders:
+                tapes = generate_tapes(lender, rows, data_dir, reuse=args.data_dir is not None)
+                best = {}
+                for _ in range(args.repeat):
+                    report = run_tapes(tapes, args.chunksize, args.engine, args.format, directory)
+                    for entry in report['stages']:
+                        name = entry['name']
+                        if name not in best or entry['wall_time'] < best[name]['wall_time']:
+                            best[name] = entry
+                for name, entry in best.items():
+                    print(f"{tapes.lender:>20} {rows:>10} {name:>16} {entry['wall_time']:>10.3f} {entry['cpu_time']:>10.3f}")
+                results[f"{tapes.lender}/{rows}"] = {name: entry['wall_time'] for name, entry in best.items()}
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for run, stage, previous, seconds in regressions:
+            print(f"REGRESSION {run} {stage}: {previous:.3f}s -> {seconds:.3f}s")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Generate synthetic raw, standard and calculations CSV triples for the
+registered lenders.
+
+Raw tapes use the lender's registered columns, plus a few columns the lender
+schema does not keep. Values are typed from the column name:
+- money columns carry currency symbols and thousands separators
+- rate columns carry percent signs
+- date columns mix several formats with some blanks and junk
+- a share of the headers is padded with whitespace, as real tapes are
+
+Rows are written in chunks, so 10M-row tapes do not have to fit in memory.
+
+Run from the repository root:
+
+    python -m benchmarks.tapes --lenders verdam liberis --rows 10000 --output synthetic_tapes
+"""
+import argparse
+import os
+import re
+import numpy as np
+import pandas as pd
+from lender_registry import get_registry
+
+
+DATE_FORMATS = ['%d/%m/%Y', '%Y-%m-%d', '%d-%b-%Y', '%d/%m/%y']
+STATUSES = ['Active', 'Repaid', 'Arrears', 'Default', 'Written Off']
+EXTRA_COLUMNS = ['Internal Notes', 'Broker Ref 2', 'Batch']
+CHUNK_ROWS = 1_000_000
+
+ID_PATTERN = re.compile(r'ID\b|\bId\b|\bid\b|Ref\b|Identifier|Agreement Number|Account Code|Contract Number')
+PERCENT_WORDS = ('%', 'apr', 'rate', 'percentage', 'split', 'ltv', 'loan to value', 'exp.')
+MONEY_WORDS = (
+    'amount', 'balance', 'principal', 'principle', 'payment', 'paid', 'price', 'revenue', 'fee', 'deposit',
+    'income', 'recover', 'repayment', 'cost', 'capital', 'instalment', '£', 'advance', 'outstanding',
+    'default', 'received', 'receipts', 'valuation', 'limit', 'due', 'charges', 'collections', 'left', 'pay',
+)
+# Counts are checked before money and the looser 'month'/'arrears' after it,
+# so 'Days Paying' is a count but 'Monthly Revenue' and 'Arrears Amount' are money
+COUNT_WORDS = ('term', 'days', 'months', 'number', 'score', 'seasoning', 'renewal', 'mileage', 'years', 'views')
+INTEGER_WORDS = ('month', 'arrears')
+
+
+def column_kind(column):
+    """
+    Decide what kind of values a raw column holds from its name.
+
+    Args:
+        column (str): The raw column name.
+
+    Returns:
+        str: One of 'date', 'percent', 'id', 'money', 'integer' or 'category'.
+    """
+    name = column.lower()
+    if 'date' in name:
+        return 'date'
+    if any(word in name for word in PERCENT_WORDS):
+        return 'percent'
+    if ID_PATTERN.search(column):
+        return 'id'
+    if any(word in name for word in COUNT_WORDS) or re.search(r'\bage\b', name):
+        return 'integer'
+    if any(word in name for word in MONEY_WORDS):
+        return 'money'
+    if any(word in name for word in INTEGER_WORDS):
+        return 'integer'
+    return 'category'
+
+
+def padded(column, rng):
+    """Pad roughly a third of the headers with leading or trailing whitespace."""
+    draw = rng.random()
+    if draw < 0.15:
+        return f" {column} "
+    if draw < 0.3:
+        return f"{column} "
+    return column
+
+
+def generate_values(kind, column, start, rows, rng, currency_symbol='£'):
+    """
+    Generate one chunk of a raw column.
+
+    Args:
+        kind (str): The column kind from column_kind.
+        column (str): The raw column name.
+        start (int): Row number of the first row of the chunk.
+        rows (int): Number of rows in the chunk.
+        rng (Generator): Random generator.
+        currency_symbol (str): Symbol put in front of money values.
+
+    Returns:
+        ndarray or Series: The column values.
+    """
+    if kind == 'id':
+        return np.arange(start, start + rows)
+    if kind == 'money':
+        amounts = pd.Series(rng.gamma(2.0, 4000.0, rows).round(2))
+        return currency_symbol + amounts.map('{:,.2f}'.format)
+    if kind == 'percent':
+        return pd.Series(rng.uniform(0.5, 35.0, rows).round(2)).astype(str) + '%'
+    if kind == 'integer':
+        name = column.lower()
+        if 'score' in name:
+            return rng.integers(300, 1000, rows)
+        return rng.integers(0, 120 if 'term' in name else 12, rows)
+    if kind == 'date':
+        dates = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3650, rows), unit='D')
+        # Mostly one format per column, with a minority of other formats, blanks and junk
+        choice = rng.choice(len(DATE_FORMATS) + 2, rows, p=[0.85, 0.05, 0.03, 0.03, 0.02, 0.02])
+        values = pd.Series(np.empty(rows, dtype=object))
+        for position, date_format in enumerate(DATE_FORMATS):
+            mask = choice == position
+            values[mask] = dates[mask].strftime(date_format)
+        values[choice == len(DATE_FORMATS)] = None
+        values[choice == len(DATE_FORMATS) + 1] = 'n/a'
+        return values
+    if 'status' in column.lower():
+        return rng.choice(STATUSES, rows)
+    return rng.choice([f"{column.strip()} {label}" for label in 'ABCDE'], rows)
+
+
+class TapeSet:
+    def __init__(self, lender, raw_path, standard_path, calculations_path, rows, llm_code):
+        """
+        Initialize the TapeSet class, the files generated for one lender.
+
+        Args:
+            lender (str): The registered lender name.
+            raw_path (str): Path of the raw tape.
+            standard_path (str): Path of the standard file.
+            calculations_path (str): Path of the calculations file.
+            rows (int): Number of rows in the raw tape.
+            llm_code (dict): Python code a stubbed LLM returns for the expressions
+                FormulaCompiler does not handle.
+        """
+        self.lender = lender
+        self.raw_path = raw_path
+        self.standard_path = standard_path
+        self.calculations_path = calculations_path
+        self.rows = rows
+        self.llm_code = llm_code
+
+
+def build_calculations(columns, kinds):
+    """
+    Build the calculated fields of a lender from its numeric columns.
+
+    Returns one compiler-friendly expression per numeric column kind found,
+    and one expression that only the LLM converts, with its row-wise code.
+
+    Args:
+        columns (list): The lender's raw column names.
+        kinds (dict): Column kind for each column.
+
+    Returns:
+        tuple: A dict of field name to expression, and a dict of expression to python code.
+    """
+    integers = [column for column in columns if kinds[column] == 'integer']
+    # Prefer an arrears count for the eligibility rule, as the real calculations do
+    integers.sort(key=lambda column: 'arrears' not in column.lower())
+    money = [column for column in columns if kinds[column] == 'money']
+    calculations = {}
+    llm_code = {}
+    if integers:
+        calculations['Synthetic Eligibility'] = f'IF([{integers[0]}] > 6, "Ineligible", "Eligible")'
+    if len(money) >= 2:
+        calculations['Synthetic Ratio'] = f'IF([{money[1]}] > 0, ROUND([{money[0]}] / [{money[1]}], 4), 0)'
+    if integers:
+        expression = f'TEXT([{integers[0]}], "00")'
+        calculations['Synthetic Label'] = expression
+        llm_code[expression] = (
+            "def label(row):\n"
+            f"    return str(row[{integers[0]!r}]).zfill(2)\n\n"
+            "result = df_mapped.apply(label, axis=1)"
+        )
+    return calculations, llm_code
+
+
+def generate_tapes(lender, rows, directory, seed=0, currency_symbol='£', reuse=False):
+    """
+    Write the raw, standard and calculations files of one lender.
+
+    Args:
+        lender (str): The registered lender name.
+        rows (int): Number of rows in the raw tape.
+        directory (str): Output directory.
+        seed (int): Seed of the random generator.
+        currency_symbol (str): Symbol put in front of money values.
+        reuse (bool): Keep a raw tape already generated with the same seed and row count.
+
+    Returns:
+        TapeSet: The generated files.
+    """
+    registry = get_registry()
+    name = registry.lookup(lender)
+    if name is None:
+        raise ValueError(f"Unknown lender: {lender}")
+    lender = name
+    rng = np.random.default_rng(seed)
+    columns = registry.columns[lender]
+    kinds = {column: column_kind(column) for column in columns + EXTRA_COLUMNS}
+    headers = [padded(column, rng) for column in columns + EXTRA_COLUMNS]
+
+    os.makedirs(directory, exist_ok=True)
+    raw_path = os.path.join(directory, f"{lender}_synthetic_{rows}.csv")
+    starts = range(0, rows, CHUNK_ROWS)
+    if reuse and os.path.exists(raw_path):
+        starts = []
+    for start in starts:
+        size = min(CHUNK_ROWS, rows - start)
+        chunk = pd.DataFrame({
+            header: generate_values(kinds[column], column, start, size, rng, currency_symbol)
+            for header, column in zip(headers, columns + EXTRA_COLUMNS)
+        })
+        chunk.to_csv(raw_path, index=False, header=start == 0, mode='w' if start == 0 else 'a')
+
+    calculations, llm_code = build_calculations(columns, kinds)
+    standard = {column: column for column in columns}
+    standard.update({'Country': 'UK', 'Reporting Currency': 'GBP', 'Servicer Notes': '-'})
+    standard.update({field: 'Calculation' for field in calculations})
+    standard_path = os.path.join(directory, f"{lender}_standard.csv")
+    pd.DataFrame([standard]).to_csv(standard_path, index=False)
+
+    calculations_path = os.path.join(directory, f"{lender}_calculations.csv")
+    pd.DataFrame({'Field Name': list(calculations), 'Calculations': list(calculations.values())}).to_csv(
+        calculations_path, index=False)
+
+    return TapeSet(lender, raw_path, standard_path, calculations_path, rows, llm_code)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lenders', nargs='+', default=None, help="Lenders to generate, all registered by default.")
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--output', default='synthetic_tapes')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for lender in args.lenders or list(get_registry().columns):
+        tapes = generate_tapes(lender, args.rows, args.output, seed=args.seed)
+        print(f"{tapes.lender}: {tapes.raw_path}, {tapes.standard_path}, {tapes.calculations_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,57 @@
 import openai
 import os
 import pandas as pd
+import random
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from formula_cache import FormulaCache
+from formula_compiler import FormulaCompiler, FormulaSyntaxError
 load_dotenv()
 
 
 # openai.api_key = os.getenv('OPENAI_API_KEY')
 
+# Errors worth retrying: rate limits, overloaded servers and dropped connections
+RETRYABLE_ERRORS = tuple(
+    getattr(getattr(openai, 'error', None), name)
+    for name in ('RateLimitError', 'ServiceUnavailableError', 'APIConnectionError', 'Timeout', 'TryAgain')
+    if hasattr(getattr(openai, 'error', None), name)
+)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
 
 class FormulaConverter:
-    def __init__(self):
+    def __init__(self, cache=None, use_cache=True, client=None, max_workers=1, max_retries=5, backoff=1.0,
+                 use_compiler=True, vectorized=False):
+        """
+        Initialize the FormulaConverter class.
+
+        Args:
+            cache (FormulaCache): Cache for converted expressions, a local SQLite cache by default.
+            use_cache (bool): Set to False to always call the API.
+            client: Object exposing ChatCompletion.create, the openai module by default.
+            max_workers (int): Number of expressions converted concurrently.
+            max_retries (int): Retries for a rate limited or failed request.
+            backoff (float): Base delay in seconds for the exponential backoff.
+            use_compiler (bool): Compile simple expressions locally and only send the rest to the LLM.
+            vectorized (bool): Ask the LLM for whole-column code instead of a row-wise apply.
+        """
         load_dotenv()
-        self.openai = openai
+        self.openai = client or openai
         # self.openai.api_type="azure"
         # self.openai.api_base=os.getenv("OPENAI_API_ENDPOINT")
         # self.api_version="2023-05-15"
         self.openai.api_key=os.getenv("OPENAI_API_KEY")
+        self.model = "gpt-3.5-turbo-16k"
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.use_compiler = use_compiler
+        self.cache = None
+        if use_cache:
+            self.cache = cache or FormulaCache()
 
         self.prompt = '''
         Convert the below spreadsheet(.csv) expressions into a compile ready python script. Follow the below examples:
@@ -40,6 +75,24 @@ class FormulaConverter:
             5. You are not helping me if you include any spreadsheet expression in final code.
 
         '''
+        self.vectorized_prompt = '''
+        Convert the below spreadsheet(.csv) expressions into a compile ready python script that works on whole pandas columns. Follow the below examples:
+
+        1.  INPUT : IF(or(loan_delinquency_status > 6, loan_current_outstanding_balance=0),"Ineligible","Eligible")
+
+            OUTPUT :  result = np.where((pd.to_numeric(df_mapped['loan_delinquency_status'], errors='coerce') > 6) | (pd.to_numeric(df_mapped['loan_current_outstanding_balance'], errors='coerce') == 0), "Ineligible", "Eligible")
+
+        Understand the above examples and follow the instructions given below:
+
+            1. Remember strictly return only the python executable script as given in examples don't return any other text with it.
+            2. Only use whole column operations on df_mapped with np and pd (np.where, np.select, boolean masks, arithmetic on columns). Never use apply, loops or row by row functions.
+            3. Assign the final column to a variable called result.
+            4. Return only the converted python code.
+            5. You are not helping me if you include any spreadsheet expression in final code.
+
+        '''
+        if vectorized:
+            self.prompt = self.vectorized_prompt
         self.ques_prmpt = '''
         Here you go:\n
         '''
@@ -48,23 +101,68 @@ class FormulaConverter:
         """
         Convert a spreadsheet expression to a Python script.
 
+        Simple IF/AND/OR/comparison/arithmetic expressions are compiled locally
+        into column-wise code; anything else is sent to the LLM.
+
         Args:
             sp_ex (str): The spreadsheet expression to convert.
 
         Returns:
             str: The converted Python script.
         """
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo-16k",
-            # engine="gpt-4-32k",
-            messages=[
-                {"role": "system", "content": self.prompt},
-                {"role": "user", "content": self.ques_prmpt + sp_ex}
-            ]
-        )
-
-        converted_code = response['choices'][0]['message']['content']
-        return self.clean_code(converted_code)
+        if self.use_compiler:
+            try:
+                return FormulaCompiler().compile(sp_ex)
+            except FormulaSyntaxError:
+                pass
+
+        key = None
+        if self.cache is not None:
+            key = FormulaCache.make_key(self.model, self.prompt + self.ques_prmpt, sp_ex)
+            cached_code = self.cache.get(key)
+            if cached_code is not None:
+                return cached_code
+
+        response = self.create_completion([
+            {"role": "system", "content": self.prompt},
+            {"role": "user", "content": self.ques_prmpt + sp_ex}
+        ])
+
+        converted_code = self.clean_code(response['choices'][0]['message']['content'])
+        if key is not None:
+            self.cache.set(key, converted_code)
+        return converted_code
+
+    def create_completion(self, messages):
+        """
+        Call the chat completion API, retrying rate limited and transient failures.
+
+        Waits for the server's Retry-After header when it sends one, otherwise
+        backs off exponentially with jitter.
+
+        Args:
+            messages (list): The chat messages.
+
+        Returns:
+            dict: The API response.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.openai.ChatCompletion.create(
+                    model=self.model,
+                    # engine="gpt-4-32k",
+                    messages=messages
+                )
+            except Exception as e:
+                status = getattr(e, 'http_status', None)
+                if attempt == self.max_retries or not (isinstance(e, RETRYABLE_ERRORS) or status in RETRYABLE_STATUS):
+                    raise
+                retry_after = (getattr(e, 'headers', None) or {}).get('retry-after')
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = self.backoff * 2 ** attempt + random.uniform(0, self.backoff)
+                time.sleep(delay)
 
     @staticmethod
     def clean_code(code):
@@ -80,7 +178,7 @@ class FormulaConverter:
         cleaned_code = re.sub(r'"""|\'\'\'', '', code)
         return cleaned_code
 
-    def convert(self, df):
+    def convert(self, df, max_workers=None):
         """
         Convert expressions from a CSV file and save the results to CSV, JSON, and TXT files.
 
@@ -89,14 +187,21 @@ class FormulaConverter:
             output_csv_file (str): The output CSV file to save the converted data.
             output_json_file (str): The output JSON file to save the converted data.
             output_txt_file (str): The output TXT file to save the converted data.
+            max_workers (int): Number of expressions converted concurrently, overrides the instance setting.
         """
         df_expr = df['Calculations']
         expressions = df_expr.to_list()
 
-        converted_code = []
-        for expr in expressions:
-            val = self.convert_expression(expr)
-            converted_code.append(val)
+        # Convert each distinct expression once, keeping the original row order in the output
+        unique_expressions = list(dict.fromkeys(expressions))
+        max_workers = max_workers or self.max_workers
+        if max_workers > 1 and len(unique_expressions) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                converted = dict(zip(unique_expressions, executor.map(self.convert_expression, unique_expressions)))
+        else:
+            converted = {expr: self.convert_expression(expr) for expr in unique_expressions}
+
+        converted_code = [converted[expr] for expr in expressions]
 
         df['Function_code'] = converted_code
 
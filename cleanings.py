@@ -1,17 +1,35 @@
 import pandas as pd
 import re
-from dateutil import parser
+from column_profiler import ColumnProfiler
+from date_parser import DateParser
 
 class DataCleaner:
-    def __init__(self, df):
+    def __init__(self, df, profiler=None, date_parser=None, profile=None):
         """
         Initialize the DataCleaner class with a DataFrame.
 
         Parameters:
         - df (DataFrame): The DataFrame to be cleaned.
+        - profiler (ColumnProfiler): Profiler used to classify the columns.
+        - date_parser (DateParser): Parser used for the date columns.
+        - profile (ColumnProfile): Column decisions to reuse instead of profiling this DataFrame.
         """
         self.df = df
         self.currency_symbols = {}
+        self.profiler = profiler or ColumnProfiler()
+        self.date_parser = date_parser or DateParser()
+        self.profile = profile
+
+    def profile_columns(self):
+        """
+        Classify all columns in one pass, reusing the result on later calls.
+
+        Returns:
+        - ColumnProfile: The detected currency, percentage and date columns.
+        """
+        if self.profile is None:
+            self.profile = self.profiler.profile(self.df)
+        return self.profile
 
     def detect_currency_columns(self):
         """
@@ -20,11 +38,7 @@ class DataCleaner:
         Returns:
         - List of column names with currency symbols.
         """
-        currency_columns = []
-        for column in self.df.columns:
-            if self.df[column].apply(lambda x: re.search(r'[$€£¥]', str(x)) if pd.notnull(x) else False).any():
-                currency_columns.append(column)
-        return currency_columns
+        return list(self.profile_columns().currency_columns)
 
     def detect_columns_with_spaces(self):
         """
@@ -38,13 +52,13 @@ class DataCleaner:
 
     def detect_columns_with_percentage(self):
         """
-        Detect columns with percentage signs (%).
+        Detect columns with percentage signs (%). Currency columns are not
+        included, their '%' signs go with the currency symbols.
 
         Returns:
         - List of column names with percentage signs.
         """
-        columns_with_percentage = [col for col in self.df.columns if self.df[col].apply(lambda x: '%' in str(x)).any()]
-        return columns_with_percentage
+        return list(self.profile_columns().percentage_columns)
 
     def detect_date_columns(self):
         """
@@ -67,7 +81,10 @@ class DataCleaner:
         - columns_with_currency (list): List of column names with currency symbols.
         """
         for column in columns_with_currency:
-            self.df[column] = self.df[column].apply(lambda x: re.sub('[^\d.]', '', str(x)) if pd.notnull(x) else x)
+            values = self.df[column]
+            text = values if pd.api.types.is_string_dtype(values) else values.astype(str)
+            cleaned = text.str.replace(r'[^\d.]', '', regex=True)
+            self.df[column] = cleaned.where(values.notna(), values)
             self.currency_symbols[column] = ''.join(re.findall(r'[$€£¥]', str(self.df[column].iloc[0])))
 
     def remove_percentage_symbols(self, columns_with_percentage):
@@ -90,7 +107,7 @@ class DataCleaner:
         Returns:
         - Series: A Series of extracted currency symbols.
         """
-        return self.df[column_name].str.extract(r'([$€£¥])')[0]
+        return self.df[column_name].str.extract(r'(?P<symbol>[$€£¥])')['symbol']
 
     def convert_currency_symbols(self, currency_symbols, conversion_rates):
         """
@@ -115,11 +132,7 @@ class DataCleaner:
         Returns:
         - str: The parsed and formatted date string in 'YYYY-MM-DD' format.
         """
-        try:
-            parsed_date = parser.parse(date_str, dayfirst=True, yearfirst=True)
-            return parsed_date.strftime('%Y-%m-%d')
-        except:
-            return date_str
+        return DateParser.parse_one(date_str)
 
     def remove_extra_spaces(self):
         """
@@ -127,21 +140,23 @@ class DataCleaner:
         """
         self.df.columns = self.df.columns.str.strip()
 
-    def clean_data(self, conversion_rates):
+    def clean_data(self, conversion_rates, copy=True):
         """
         Clean the DataFrame based on detected patterns.
 
         Parameters:
         - conversion_rates (dict): A dictionary mapping currency symbols to currency names.
+        - copy (bool): Return a copy of the cleaned DataFrame; with False the DataFrame
+          passed in is cleaned in place and returned, avoiding a full copy.
 
         Returns:
         - DataFrame: The cleaned DataFrame.
         """
         currency_columns = self.detect_currency_columns()
         if currency_columns:
-            self.df['Currency_Symbol'] = self.extract_currency_symbols(currency_columns[0])
-            self.df['Currency_Name'] = self.convert_currency_symbols(self.df['Currency_Symbol'], conversion_rates)
-            self.df.drop(['Currency_Symbol'], axis=1, inplace=True)
+            # The symbols are only needed to name the currency, so they never become a column
+            currency_symbols = self.extract_currency_symbols(currency_columns[0])
+            self.df['Currency_Name'] = self.convert_currency_symbols(currency_symbols, conversion_rates)
             self.remove_currency_symbols(currency_columns)
 
         percentage_columns = self.detect_columns_with_percentage()
@@ -150,10 +165,16 @@ class DataCleaner:
 
         date_columns = self.detect_date_columns()
         if date_columns:
+            date_formats = self.profile_columns().date_formats
             for column in date_columns:
-                self.df[column] = self.df[column].apply(self.parse_and_format_date)
+                # Distinct values are parsed once, in bulk where the column has a consistent format
+                self.df[column], date_formats[column] = self.date_parser.parse_column(
+                    self.df[column], date_formats.get(column)
+                )
 
         self.remove_extra_spaces()
+        if not copy:
+            return self.df
         cleaned_df = self.df.copy()
         return cleaned_df
 
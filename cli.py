@@ -0,0 +1,170 @@
+import argparse
+import logging
+import os
+import sys
+import pandas as pd
+from pipeline import DataPipeline
+from calculations import FormulaConverter
+from column_profiler import ColumnProfiler
+from batch import BatchProcessor
+from exporters import DataFrameExporter, EXPORT_FORMATS, format_from_path
+from instrumentation import Instrumentation
+from incremental import IncrementalStore
+from dtype_compactor import DtypeCompactor
+from formula_sandbox import FormulaSandbox
+
+
+def list_raw_files(raw_path):
+    """
+    List the raw CSV files to process.
+
+    Args:
+        raw_path (str): A raw CSV file or a directory of raw CSV files.
+
+    Returns:
+        list: Sorted list of raw file paths.
+    """
+    if os.path.isdir(raw_path):
+        return sorted(
+            os.path.join(raw_path, name)
+            for name in os.listdir(raw_path)
+            if name.lower().endswith('.csv')
+        )
+    return [raw_path]
+
+
+def output_path_for(raw_file, output, many, extension='.csv'):
+    """
+    Work out where the mapped output of a raw file should be written.
+
+    Args:
+        raw_file (str): Path of the raw CSV file.
+        output (str): Output file, or output directory when processing many files.
+        many (bool): Whether a directory of tapes is being processed.
+        extension (str): Extension of the output files written to a directory.
+
+    Returns:
+        str: The output file path.
+    """
+    if not many:
+        return output
+    stem = os.path.splitext(os.path.basename(raw_file))[0]
+    return os.path.join(output, f"{stem}_mapped{extension}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Run the extract/clean/calculate/rename pipeline on lender tapes without the Streamlit UI."
+    )
+    parser.add_argument('--raw', required=True, help="Raw CSV file, or a directory of raw CSV files.")
+    parser.add_argument('--standard', required=True, help="Standard CSV file.")
+    parser.add_argument('--calculations', required=True, help="Calculations CSV file.")
+    parser.add_argument('--output', default='calculated_data.csv',
+                        help="Output file, or output directory when --raw is a directory.")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default=None,
+                        help="Output format; defaults to the --output extension, or csv.")
+    parser.add_argument('--compression', default=None,
+                        help="Codec for parquet (default snappy) or feather (default lz4) output, e.g. zstd or none.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes used to process tapes in parallel (0 uses all cores).")
+    parser.add_argument('--llm-workers', type=int, default=4,
+                        help="Number of calculations converted concurrently by the LLM.")
+    parser.add_argument('--vectorized', action='store_true',
+                        help="Ask the LLM for whole-column code instead of a row-wise apply.")
+    parser.add_argument('--detection', choices=['full', 'sample'], default='full',
+                        help="Detect currency and percentage columns from every row or from a sample of rows.")
+    parser.add_argument('--sample-size', type=int, default=1000,
+                        help="Rows sampled from each of the head, tail and middle in sample detection mode.")
+    parser.add_argument('--confidence', type=float, default=0.9,
+                        help="Share of sampled values needed to decide without falling back to a full scan.")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Stream each tape in chunks of this many rows instead of loading it whole.")
+    parser.add_argument('--engine', choices=['c', 'pyarrow'], default=None,
+                        help="CSV parser engine; pyarrow uses multithreaded parsing and Arrow string dtypes.")
+    parser.add_argument('--compact-dtypes', action='store_true',
+                        help="Convert cleaned money, rate, date and repetitive text columns to compact dtypes.")
+    parser.add_argument('--float32', action='store_true',
+                        help="With --compact-dtypes, store numbers as float32 instead of float64.")
+    parser.add_argument('--state-dir', default=None,
+                        help="Incremental mode: keep each output's previous run here, keyed on lender and output name, "
+                             "and only recompute new or changed loans.")
+    parser.add_argument('--sandbox', action='store_true',
+                        help="Run each calculated field in a separate process with time and memory limits.")
+    parser.add_argument('--formula-timeout', type=float, default=60,
+                        help="With --sandbox, seconds a calculated field may run before it is stopped.")
+    parser.add_argument('--formula-memory', type=int, default=None,
+                        help="With --sandbox, MiB a calculated field may allocate.")
+    parser.add_argument('--report', default=None,
+                        help="Write a JSON report of time, CPU, memory and shape per stage and calculated field.")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Measure each stage's peak Python allocations with tracemalloc (slower).")
+    return parser
+
+
+def log_report(report):
+    """
+    Log one line per stage of an instrumentation report.
+
+    Args:
+        report (dict): The report built by Instrumentation.report.
+    """
+    for entry in report['stages']:
+        memory = ''
+        if entry['peak_memory'] is not None:
+            memory = f", peak {entry['peak_memory'] / 2 ** 20:.1f} MiB"
+        logging.info(f"{entry['name']:>16}: {entry['wall_time']:.3f}s wall, {entry['cpu_time']:.3f}s cpu, "
+                     f"{entry['rows']} rows x {entry['columns']} columns{memory}")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+
+    raw_files = list_raw_files(args.raw)
+    if not raw_files:
+        logging.error(f"No raw CSV files found in {args.raw}")
+        return 1
+
+    many = os.path.isdir(args.raw)
+    output_format = args.format or ('csv' if many else format_from_path(args.output))
+    exporter = DataFrameExporter(output_format, compression=args.compression)
+    if many:
+        os.makedirs(args.output, exist_ok=True)
+
+    standard_df = pd.read_csv(args.standard)
+    calculations_df = pd.read_csv(args.calculations)
+    converter = FormulaConverter(max_workers=args.llm_workers, vectorized=args.vectorized)
+    profiler = ColumnProfiler(mode=args.detection, sample_size=args.sample_size, confidence=args.confidence)
+    compactor = None
+    if args.compact_dtypes:
+        compactor = DtypeCompactor(float_dtype='float32' if args.float32 else 'float64')
+    sandbox = None
+    if args.sandbox:
+        sandbox = FormulaSandbox(timeout=args.formula_timeout, memory_limit=args.formula_memory)
+    instrumentation = Instrumentation(trace_memory=args.trace_memory) if args.report or args.trace_memory else None
+    pipeline = DataPipeline(standard_df, calculations_df, converter=converter, profiler=profiler,
+                            chunksize=args.chunksize, engine=args.engine, exporter=exporter,
+                            instrumentation=instrumentation,
+                            state_store=IncrementalStore(args.state_dir) if args.state_dir else None,
+                            compactor=compactor, sandbox=sandbox)
+
+    jobs = [(raw_file, output_path_for(raw_file, args.output, many, exporter.extension)) for raw_file in raw_files]
+    results, errors = BatchProcessor(pipeline, max_workers=args.workers or None).run(jobs)
+
+    for raw_file, output_path in results.items():
+        logging.info(f"{raw_file} -> {output_path}")
+    for raw_file, error in errors.items():
+        logging.error(f"Failed to process {raw_file}:\n{error}")
+    logging.info(f"Processed {len(results)} of {len(jobs)} tapes")
+
+    if instrumentation is not None:
+        log_report(instrumentation.report())
+        if args.report:
+            instrumentation.write_report(args.report)
+            logging.info(f"Run report written to {args.report}")
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
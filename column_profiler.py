@@ -0,0 +1,166 @@
+import pandas as pd
+
+
+CURRENCY_SYMBOLS = '$€£¥'
+PERCENTAGE_SYMBOL = '%'
+
+
+class ColumnProfile:
+    def __init__(self, currency_columns, percentage_columns, date_columns, date_formats=None, dtypes=None):
+        """
+        Initialize the ColumnProfile class.
+
+        Parameters:
+        - currency_columns (list): Columns containing currency symbols.
+        - percentage_columns (list): Columns containing percentage signs, excluding currency columns.
+        - date_columns (list): Columns with "date" in their names.
+        - date_formats (dict): Format inferred for each date column, filled in while cleaning.
+        - dtypes (dict): Compact dtype chosen for each column, filled in by DtypeCompactor.
+        """
+        self.currency_columns = currency_columns
+        self.percentage_columns = percentage_columns
+        self.date_columns = date_columns
+        self.date_formats = date_formats if date_formats is not None else {}
+        self.dtypes = dtypes if dtypes is not None else {}
+
+
+class ColumnProfiler:
+    """
+    Classify the columns of a DataFrame for DataCleaner in a single pass.
+    """
+
+    def __init__(self, mode='full', sample_size=1000, confidence=0.9, random_state=0):
+        """
+        Initialize the ColumnProfiler class.
+
+        Parameters:
+        - mode (str): 'full' scans every row, 'sample' decides from a sample of the rows.
+        - sample_size (int): Rows taken from each of the head, the tail and a random draw.
+        - confidence (float): Share of sampled values that must carry a symbol for the
+          sample to decide on its own. Columns where only some sampled values carry it
+          are ambiguous and get a full scan.
+        - random_state (int): Seed for the random part of the sample.
+        """
+        if mode not in ('full', 'sample'):
+            raise ValueError(f"Unknown detection mode: {mode}")
+        self.mode = mode
+        self.sample_size = sample_size
+        self.confidence = confidence
+        self.random_state = random_state
+
+    def sample_rows(self, df):
+        """
+        Take a stratified sample of the rows: the head, the tail and a random draw from the rest.
+
+        Parameters:
+        - df (DataFrame): The DataFrame to sample.
+
+        Returns:
+        - DataFrame: The sampled rows.
+        """
+        middle = df.iloc[self.sample_size:-self.sample_size]
+        random_rows = middle.sample(n=min(self.sample_size, len(middle)), random_state=self.random_state)
+        return pd.concat([df.head(self.sample_size), random_rows, df.tail(self.sample_size)])
+
+    def sampled_symbols(self, series, sample):
+        """
+        Decide which symbols a column holds from a sample, scanning the full
+        column only when the sample is ambiguous.
+
+        Parameters:
+        - series (Series): The full column.
+        - sample (Series): The sampled values of the column.
+
+        Returns:
+        - set: The symbols found.
+        """
+        values = sample.dropna()
+        if values.empty:
+            return self.symbols_in(series)
+        text = values.astype(str)
+        symbols = set()
+        for symbol_class, found in ((f"[{CURRENCY_SYMBOLS}]", set(CURRENCY_SYMBOLS)), (PERCENTAGE_SYMBOL, {PERCENTAGE_SYMBOL})):
+            share = text.str.contains(symbol_class, regex=True).mean()
+            if share >= self.confidence:
+                symbols |= found
+            elif share > 0:
+                return self.symbols_in(series)
+        return symbols
+
+    @staticmethod
+    def is_text_column(series):
+        """
+        Check whether a column can hold symbols at all; numeric, boolean and
+        datetime columns never do and are skipped.
+
+        Parameters:
+        - series (Series): The column to check.
+
+        Returns:
+        - bool: True for object and string columns.
+        """
+        return not (
+            pd.api.types.is_numeric_dtype(series)
+            or pd.api.types.is_bool_dtype(series)
+            or pd.api.types.is_datetime64_any_dtype(series)
+        )
+
+    @staticmethod
+    def symbols_in(series):
+        """
+        Find which kinds of symbols (currency, percentage) appear anywhere in a column.
+
+        Each check is one vectorized str.contains over the column, which runs on
+        Arrow compute kernels for Arrow-backed strings.
+
+        Parameters:
+        - series (Series): The column to scan.
+
+        Returns:
+        - set: The symbols found; all currency symbols are returned when any is present.
+        """
+        values = series.dropna()
+        if values.empty:
+            return set()
+        if not pd.api.types.is_string_dtype(values):
+            # Object columns mixing strings with other values
+            values = values.astype(str)
+        symbols = set()
+        if values.str.contains(f"[{CURRENCY_SYMBOLS}]", regex=True).any():
+            symbols |= set(CURRENCY_SYMBOLS)
+        if values.str.contains(PERCENTAGE_SYMBOL, regex=False).any():
+            symbols.add(PERCENTAGE_SYMBOL)
+        return symbols
+
+    def profile(self, df):
+        """
+        Classify every column of the DataFrame.
+
+        Parameters:
+        - df (DataFrame): The DataFrame to profile.
+
+        Returns:
+        - ColumnProfile: The detected currency, percentage and date columns.
+        """
+        sample = None
+        if self.mode == 'sample' and len(df) > 3 * self.sample_size:
+            sample = self.sample_rows(df)
+
+        currency_columns = []
+        percentage_columns = []
+        for column in df.columns:
+            series = df[column]
+            if not self.is_text_column(series):
+                continue
+            if sample is None:
+                symbols = self.symbols_in(series)
+            else:
+                symbols = self.sampled_symbols(series, sample[column])
+            if symbols & set(CURRENCY_SYMBOLS):
+                currency_columns.append(column)
+            elif PERCENTAGE_SYMBOL in symbols:
+                # Removing the currency symbols also strips '%' from currency columns
+                percentage_columns.append(column)
+
+        date_columns = [column for column in df.columns if 'date' in column.lower()]
+        return ColumnProfile(currency_columns, percentage_columns, date_columns)
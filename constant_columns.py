@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+
+def constant_column(value, index):
+    """
+    Build a column holding one value on every row, as a single-category Categorical.
+
+    The value is stored once and every row holds a one-byte code, instead of a
+    Python object or float per row. Null fields ('-') become an all-missing
+    Categorical, which is written exactly like a float NaN column.
+
+    Parameters:
+    - value: The hardcoded value, or NaN for a null field.
+    - index (Index): The index of the frame the column belongs to.
+
+    Returns:
+    - Series: The categorical column.
+    """
+    if pd.isna(value):
+        categorical = pd.Categorical.from_codes(np.full(len(index), -1, dtype=np.int8),
+                                                categories=pd.Index([], dtype=float))
+    else:
+        categorical = pd.Categorical.from_codes(np.zeros(len(index), dtype=np.int8), categories=[value])
+    return pd.Series(categorical, index=index)
+
+
+class ConstantColumns:
+    """
+    Keep the hardcoded and null standard fields of a run as one value each.
+
+    HardcodeColumns records these fields here instead of adding a column per
+    field to the working frame, so they take memory per distinct value rather
+    than per row while the frame goes through the later stages. expand() adds
+    them back, in the output column order, when the frame is written or handed
+    to the caller.
+    """
+
+    def __init__(self, values=None, column_order=None):
+        """
+        Initialize the ConstantColumns class.
+
+        Parameters:
+        - values (dict): Field name to its value, NaN for null fields.
+        - column_order (list): Column order of the output, including the constant fields.
+        """
+        self.values = dict(values or {})
+        self.column_order = list(column_order or [])
+
+    def __len__(self):
+        return len(self.values)
+
+    def rename(self, mapping):
+        """
+        Apply a column renaming, as done to the working frame by the rename stage.
+
+        Parameters:
+        - mapping (dict): Old column name to new column name.
+        """
+        self.values = {mapping.get(key, key): value for key, value in self.values.items()}
+        self.column_order = [mapping.get(column, column) for column in self.column_order]
+
+    def expand(self, df):
+        """
+        Add the constant fields to a frame as categorical columns.
+
+        Parameters:
+        - df (DataFrame): The working frame, without the constant fields.
+
+        Returns:
+        - DataFrame: A new frame with every column in output order; df itself is not changed.
+        """
+        if not self.values:
+            return df
+        columns = {key: constant_column(value, df.index) for key, value in self.values.items()}
+        expanded = df.assign(**columns)
+        order = [column for column in self.column_order if column in expanded.columns]
+        order += [column for column in expanded.columns if column not in order]
+        if list(expanded.columns) != order:
+            expanded = expanded[order]
+        return expanded
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from dateutil import parser
+
+
+OUTPUT_FORMAT = '%Y-%m-%d'
+
+# Candidate formats for the vectorized fast path. With dayfirst and yearfirst
+# set, dateutil reads 2020-01-05 as year-day-month, so those orders are listed too.
+DATE_FORMATS = [
+    '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%d-%m-%y',
+    '%Y-%d-%m', '%Y/%d/%m', '%Y-%m-%d', '%Y/%m/%d',
+    '%Y-%m-%d %H:%M:%S', '%Y-%d-%m %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S',
+    '%d %b %Y', '%d-%b-%Y', '%d-%b-%y', '%b %d, %Y',
+]
+
+
+class DateParser:
+    def __init__(self, sample_size=200, formats=None):
+        """
+        Initialize the DateParser class.
+
+        Parameters:
+        - sample_size (int): Number of distinct values used to infer a column's format.
+        - formats (list): Candidate strptime formats for the vectorized fast path.
+        """
+        self.sample_size = sample_size
+        self.formats = formats or DATE_FORMATS
+
+    @staticmethod
+    def parse_one(date_str):
+        """
+        Parse and format one date string with dateutil.
+
+        Parameters:
+        - date_str (str): The date string to be parsed.
+
+        Returns:
+        - str: The date in 'YYYY-MM-DD' format, or the value unchanged if it cannot be parsed.
+        """
+        try:
+            parsed_date = parser.parse(date_str, dayfirst=True, yearfirst=True)
+            return parsed_date.strftime(OUTPUT_FORMAT)
+        except:
+            return date_str
+
+    def infer_format(self, values):
+        """
+        Infer one format for a column from a sample of its distinct values.
+
+        A candidate format is only accepted if every sampled value it parses
+        gives the same date as dateutil, so the fast path never changes the output.
+
+        Parameters:
+        - values (list): Distinct string values of the column.
+
+        Returns:
+        - str: The format parsing most of the sample, or None.
+        """
+        sample = pd.Index(values[:self.sample_size])
+        if sample.empty:
+            return None
+        expected = pd.Index([self.parse_one(value) for value in sample])
+
+        best_format = None
+        best_count = 0
+        for date_format in self.formats:
+            parsed = pd.to_datetime(sample, format=date_format, errors='coerce')
+            matched = ~parsed.isna()
+            count = int(matched.sum())
+            if count <= best_count:
+                continue
+            if (parsed[matched].strftime(OUTPUT_FORMAT) == expected[matched]).all():
+                best_format = date_format
+                best_count = count
+        return best_format
+
+    def parse_column(self, series, date_format=None):
+        """
+        Parse a date column, converting each distinct value once and mapping the results back.
+
+        Values matching the column format go through a vectorized to_datetime;
+        the remaining outliers are parsed one by one with dateutil.
+
+        Parameters:
+        - series (Series): The date column.
+        - date_format (str): Format for the fast path, inferred from the column when None.
+
+        Returns:
+        - tuple: The parsed column and the format used.
+        """
+        codes, uniques = pd.factorize(series)
+        if len(uniques) == 0:
+            return series, date_format
+        uniques = uniques.astype(object)
+        is_string = np.array([isinstance(value, str) for value in uniques], dtype=bool)
+        strings = uniques[is_string]
+        if date_format is None:
+            date_format = self.infer_format(list(strings))
+
+        # One result per distinct value; values that are not strings are kept as they are
+        results = uniques.to_numpy(dtype=object, copy=True)
+        outliers = np.flatnonzero(is_string)
+        if date_format is not None and len(strings):
+            parsed = pd.to_datetime(strings, format=date_format, errors='coerce')
+            matched = ~parsed.isna()
+            results[outliers[matched]] = parsed[matched].strftime(OUTPUT_FORMAT)
+            outliers = outliers[~matched]
+        for position in outliers:
+            results[position] = self.parse_one(results[position])
+
+        # Missing values have code -1 and keep their original value
+        parsed_column = pd.Series(results[codes], index=series.index, name=series.name, dtype=object)
+        missing = codes == -1
+        if missing.any():
+            parsed_column[missing] = series[missing]
+        return parsed_column, date_format
@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+from date_parser import OUTPUT_FORMAT
+
+
+INTEGER_DTYPES = ['int8', 'int16', 'int32', 'int64']
+
+# A number written with thousands separators, e.g. 15,000 or -2,752.50; plain numbers
+# are accepted too but not with leading zeros, which identifiers rely on
+SEPARATED_NUMBER = r'[-+]?(?:\d{1,3}(?:,\d{3})+|0|[1-9]\d*)(?:\.\d+)?'
+
+
+def strip_separators(values):
+    """
+    Remove the thousands separators of values that are numbers written with them.
+
+    Parameters:
+    - values (Series): The column.
+
+    Returns:
+    - Series: The column with '15,000' as '15000'; other values are unchanged.
+    """
+    if pd.api.types.is_numeric_dtype(values) or isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    numbers = values.str.fullmatch(SEPARATED_NUMBER).fillna(False).astype(bool)
+    if not numbers.any():
+        return values
+    return values.where(~numbers, values.str.replace(',', '', regex=False))
+
+
+class DtypeCompactor:
+    """
+    Convert cleaned columns to compact dtypes based on the roles DataCleaner detected.
+
+    - currency and percentage columns become floats
+    - text columns holding numbers with thousands separators ("15,000") become floats
+    - parsed date columns become datetime64
+    - integer columns get the smallest integer dtype holding their values
+    - repetitive text columns (status, product, currency name...) become categories
+
+    A column is only converted when no value would be lost: a currency column
+    holding text that is not a number, or a date column with an unparseable
+    date, is left as it is. The chosen dtypes are stored in the profile, so
+    later chunks and incremental runs of the same tape get the same dtypes.
+    """
+
+    def __init__(self, float_dtype='float64', category_ratio=0.5, nullable_ints=False):
+        """
+        Initialize the DtypeCompactor class.
+
+        Parameters:
+        - float_dtype (str): 'float64', or 'float32' to halve numeric columns at the cost of precision.
+        - category_ratio (float): Text columns with at most this share of distinct values become categories.
+        - nullable_ints (bool): Store integer columns with missing values as nullable Int dtypes
+          instead of floats. Comparisons on them return pd.NA for missing values, which row-wise
+          and np.where formulas do not expect, so this is off by default.
+        """
+        self.float_dtype = float_dtype
+        self.category_ratio = category_ratio
+        self.nullable_ints = nullable_ints
+
+    def integer_dtype(self, values):
+        """
+        Find the smallest dtype holding integer values.
+
+        Parameters:
+        - values (Series): Numeric values.
+
+        Returns:
+        - str: An integer dtype, a nullable Int dtype, or None when the values are not all integers.
+        """
+        present = values.dropna()
+        if present.empty or not np.array_equal(present, np.floor(present)):
+            return None
+        has_missing = len(present) < len(values)
+        if has_missing and not self.nullable_ints:
+            return None
+        low, high = present.min(), present.max()
+        for dtype in INTEGER_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return dtype.capitalize() if has_missing else dtype
+        return None
+
+    def plan(self, df, profile):
+        """
+        Choose a compact dtype for every column that has one.
+
+        Parameters:
+        - df (DataFrame): The cleaned DataFrame.
+        - profile (ColumnProfile): The detected currency, percentage and date columns.
+
+        Returns:
+        - dict: Column name to dtype name.
+        """
+        numeric_columns = set(profile.currency_columns) | set(profile.percentage_columns)
+        date_columns = set(profile.date_columns)
+        dtypes = {}
+        for column in df.columns:
+            values = df[column]
+            if column in date_columns:
+                dtypes[column] = 'datetime64[ns]'
+            elif column in numeric_columns:
+                dtypes[column] = self.float_dtype
+            elif pd.api.types.is_bool_dtype(values):
+                continue
+            elif pd.api.types.is_numeric_dtype(values):
+                dtypes[column] = self.integer_dtype(values) or self.float_dtype
+            elif isinstance(values.dtype, pd.CategoricalDtype):
+                continue
+            else:
+                present = values.dropna()
+                if len(present) and self.separated_numbers(present):
+                    dtypes[column] = self.float_dtype
+                elif len(present) and present.nunique() <= self.category_ratio * len(present):
+                    dtypes[column] = 'category'
+        return dtypes
+
+    @staticmethod
+    def separated_numbers(present):
+        """
+        Check whether text values are all numbers, some written with thousands separators.
+
+        Parameters:
+        - present (Series): The non-missing values of a column.
+
+        Returns:
+        - bool: True when the column is numeric once the separators are removed.
+        """
+        if not pd.api.types.is_string_dtype(present) and present.dtype != object:
+            return False
+        text = present.astype(str)
+        return bool(text.str.fullmatch(SEPARATED_NUMBER).all() and text.str.contains(',', regex=False).any())
+
+    @staticmethod
+    def convert(values, dtype):
+        """
+        Convert a column to a dtype, as long as no value is lost.
+
+        Parameters:
+        - values (Series): The column.
+        - dtype (str): The target dtype.
+
+        Returns:
+        - Series: The converted column, or the column unchanged when converting would lose values.
+        """
+        if str(values.dtype) == dtype:
+            return values
+        if dtype == 'category':
+            return values.astype('category')
+        if dtype.startswith('datetime64'):
+            converted = pd.to_datetime(values, format=OUTPUT_FORMAT, errors='coerce')
+        else:
+            converted = pd.to_numeric(strip_separators(values), errors='coerce')
+        # A value that did not convert would be lost
+        if converted.isna().sum() != values.isna().sum():
+            return values
+        if dtype in INTEGER_DTYPES or dtype.startswith('Int'):
+            if dtype in INTEGER_DTYPES and converted.isna().any():
+                return converted
+            info = np.iinfo(dtype.lower())
+            present = converted.dropna()
+            if len(present) and not (info.min <= present.min() and present.max() <= info.max):
+                return converted
+        return converted.astype(dtype)
+
+    def compact(self, df, profile):
+        """
+        Convert the columns of a cleaned DataFrame in place.
+
+        Parameters:
+        - df (DataFrame): The cleaned DataFrame.
+        - profile (ColumnProfile): The column profile; its dtypes are chosen on the first call and reused.
+
+        Returns:
+        - DataFrame: The same DataFrame with compact dtypes.
+        """
+        if not profile.dtypes:
+            profile.dtypes = self.plan(df, profile)
+        for column, dtype in profile.dtypes.items():
+            if column in df.columns:
+                df[column] = self.convert(df[column], dtype)
+        return df
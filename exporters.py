@@ -0,0 +1,213 @@
+import io
+import os
+import pandas as pd
+
+
+# Output formats, with their file extension and the MIME type used for downloads
+EXPORT_FORMATS = {
+    'csv': ('.csv', 'text/csv'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'feather': ('.feather', 'application/vnd.apache.arrow.file'),
+}
+
+# Default compression per columnar format; CSV is written uncompressed
+DEFAULT_COMPRESSION = {'parquet': 'snappy', 'feather': 'lz4'}
+
+
+def format_from_path(path, default='csv'):
+    """
+    Work out the output format from a file extension.
+
+    Args:
+        path (str): The output file path.
+        default (str): Format used when the extension is not recognised.
+
+    Returns:
+        str: One of the EXPORT_FORMATS keys.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.arrow', '.ipc'):
+        return 'feather'
+    for fmt, (format_extension, _) in EXPORT_FORMATS.items():
+        if extension == format_extension:
+            return fmt
+    return default
+
+
+def columnar_frame(df):
+    """
+    Make a DataFrame writable by Arrow.
+
+    Arrow needs one type per column, so object columns mixing strings with
+    numbers (e.g. a calculated field holding an error message) are written as
+    strings, keeping missing values missing. Other columns are left untouched.
+
+    Args:
+        df (DataFrame): The DataFrame to write.
+
+    Returns:
+        DataFrame: The DataFrame, copied only when a column had to be converted.
+    """
+    mixed = [
+        column for column in df.columns
+        if df[column].dtype == object and pd.api.types.infer_dtype(df[column], skipna=True).startswith('mixed')
+    ]
+    if not mixed:
+        return df
+    df = df.copy()
+    for column in mixed:
+        values = df[column]
+        df[column] = values.where(values.isna(), values.astype(str))
+    return df
+
+
+class DataFrameExporter:
+    def __init__(self, fmt='csv', compression=None):
+        """
+        Initialize the DataFrameExporter class.
+
+        Args:
+            fmt (str): Output format, one of 'csv', 'parquet' or 'feather'.
+            compression (str): Codec for the columnar formats, e.g. 'snappy', 'zstd',
+                'lz4' or 'none'; defaults to DEFAULT_COMPRESSION.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown output format: {fmt}")
+        self.fmt = fmt
+        self.compression = compression or DEFAULT_COMPRESSION.get(fmt)
+        if self.compression == 'none':
+            self.compression = None
+
+    @property
+    def extension(self):
+        return EXPORT_FORMATS[self.fmt][0]
+
+    @property
+    def mime_type(self):
+        return EXPORT_FORMATS[self.fmt][1]
+
+    def write(self, df, target):
+        """
+        Write a DataFrame to a path or a binary buffer.
+
+        Args:
+            df (DataFrame): The DataFrame to write.
+            target (str or file): Output path or binary file object.
+
+        Returns:
+            str or file: The target.
+        """
+        if self.fmt == 'csv':
+            if hasattr(target, 'write'):
+                # to_csv writes text; encode it for binary buffers such as BytesIO
+                target.write(df.to_csv(index=False).encode('utf-8'))
+            else:
+                df.to_csv(target, index=False)
+        elif self.fmt == 'parquet':
+            columnar_frame(df).to_parquet(target, index=False, compression=self.compression)
+        else:
+            # Feather has no index; a non-default one would be rejected
+            columnar_frame(df).reset_index(drop=True).to_feather(target, compression=self.compression or 'uncompressed')
+        return target
+
+    def to_bytes(self, df):
+        """
+        Serialize a DataFrame in memory, e.g. for st.download_button.
+
+        Args:
+            df (DataFrame): The DataFrame to serialize.
+
+        Returns:
+            bytes: The file contents.
+        """
+        buffer = io.BytesIO()
+        self.write(df, buffer)
+        return buffer.getvalue()
+
+
+class ChunkWriter:
+    def __init__(self, exporter, path):
+        """
+        Initialize the ChunkWriter class, which appends DataFrame chunks to one output file.
+
+        CSV chunks are appended as text. Parquet and Feather chunks are written
+        as row groups / record batches of one file, using the schema of the first
+        chunk with integers widened to int64; later chunks are cast to it. A
+        column with no values in the first chunk has no type yet (e.g. a text
+        field blank in the first rows is float there), so it is written as string.
+
+        Args:
+            exporter (DataFrameExporter): The exporter holding the format and compression.
+            path (str): Output file path.
+        """
+        self.exporter = exporter
+        self.path = path
+        self.columns = None
+        self.schema = None
+        self.writer = None
+
+    @staticmethod
+    def field_type(field, values):
+        """
+        Get the type a column is written with, from its values in the first chunk.
+
+        Args:
+            field (pa.Field): The column's field in the first chunk.
+            values (pa.ChunkedArray): The column's values in the first chunk.
+
+        Returns:
+            pa.Field: The field of the output schema.
+        """
+        import pyarrow as pa
+
+        if pa.types.is_integer(field.type):
+            # Integer widths may be chosen per chunk (e.g. by DtypeCompactor), so the file
+            # keeps them as int64; both formats encode small integers compactly anyway
+            return field.with_type(pa.int64())
+        # Categoricals, e.g. null standard fields, and text columns have their type set already
+        inferred = not (pa.types.is_dictionary(field.type) or pa.types.is_string(field.type)
+                        or pa.types.is_large_string(field.type))
+        if inferred and values.null_count == len(values):
+            return field.with_type(pa.string())
+        return field
+
+    def write(self, df):
+        """
+        Append a chunk to the output file.
+
+        Args:
+            df (DataFrame): The chunk, with the same columns as the first one.
+        """
+        if self.columns is None:
+            self.columns = list(df.columns)
+        elif list(df.columns) != self.columns:
+            df = df.reindex(columns=self.columns)
+
+        if self.exporter.fmt == 'csv':
+            first = self.writer is None
+            df.to_csv(self.path, index=False, header=first, mode='w' if first else 'a')
+            self.writer = self.path
+            return
+
+        import pyarrow as pa
+        table = pa.Table.from_pandas(columnar_frame(df), preserve_index=False)
+        if self.writer is None:
+            self.schema = pa.schema([self.field_type(field, table.column(field.name)) for field in table.schema],
+                                    metadata=table.schema.metadata)
+            if self.exporter.fmt == 'parquet':
+                import pyarrow.parquet as pq
+                self.writer = pq.ParquetWriter(self.path, self.schema, compression=self.exporter.compression or 'none')
+            else:
+                options = pa.ipc.IpcWriteOptions(compression=self.exporter.compression)
+                self.writer = pa.ipc.new_file(self.path, self.schema, options=options)
+        self.writer.write_table(table.cast(self.schema))
+
+    def close(self):
+        if self.writer is not None and self.exporter.fmt != 'csv':
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
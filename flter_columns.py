@@ -1,6 +1,7 @@
 import pandas as pd
 import math
 import logging
+from lender_registry import get_registry, MIN_CONFIDENCE
 
 class ColumnExtractor:
     def __init__(self, raw_df, stan_df, calc_df):
@@ -17,669 +18,192 @@ class ColumnExtractor:
         self.calc_df = calc_df
         # self.file_name = file_name
 
-    def get_useful_columns(self, file_name):
+    @staticmethod
+    def get_lender_columns():
+        """
+        Get the columns kept for each known lender.
+
+        Returns:
+            dict: A dictionary mapping lender names to their column names.
+        """
+        return get_registry().columns
+
+    @staticmethod
+    def match_lender(file_name, header=None):
+        """
+        Find the lender from the '<lender>_...' file name convention, falling back
+        to the header fingerprint when the file name does not follow it.
+
+        Args:
+            file_name (str): Name of the raw file.
+            header (list): The stripped raw column names, if already known.
+
+        Returns:
+            str: The registered lender name, or None.
+        """
+        registry = get_registry()
+        lender = registry.lender_from_file_name(file_name)
+        if lender is None and header is not None:
+            match = registry.match_header(header)
+            if match is not None and match.confidence >= MIN_CONFIDENCE:
+                lender = match.lender
+                logging.info(f"Detected lender '{lender}' from the header of {file_name} "
+                             f"(confidence {match.confidence:.0%}, {match.matched_columns} columns)")
+            elif match is not None:
+                logging.warning(f"No lender matched {file_name}; closest is '{match.lender}' "
+                                f"(confidence {match.confidence:.0%}), keeping every column")
+        return lender
+
+    @staticmethod
+    def match_lender_columns(file_name, header=None):
+        """
+        Find the set of columns kept for the lender of a raw file.
+
+        Args:
+            file_name (str): Name of the raw file.
+            header (list): The stripped raw column names, if already known.
+
+        Returns:
+            frozenset: The lender's column names as spelled in the header (as registered when
+            no header is given), or an empty set when no lender matches.
+        """
+        lender = ColumnExtractor.match_lender(file_name, header)
+        if lender is None:
+            return frozenset()
+        if header is None:
+            return get_registry().column_sets[lender]
+        # Header detection compares names ignoring case, so the columns are selected the same way
+        return get_registry().header_columns(lender, header)
+
+    @staticmethod
+    def read_useful_columns(source, file_name, **kwargs):
+        """
+        Read a raw CSV, parsing only the columns get_useful_columns would keep.
+
+        The header is read first and matched against the lender's columns after
+        stripping whitespace, so the other columns are never parsed. When the
+        lender is unknown every column is read, as get_useful_columns keeps them all.
+
+        With a chunksize every chunk is read with the dtypes the whole file would
+        get (see infer_dtypes), so a column is parsed the same way in every chunk
+        and streamed output matches output from the whole tape.
+
+        With engine='pyarrow' the file is parsed by pyarrow's multithreaded reader
+        into Arrow-backed dtypes, so DataCleaner's string cleaning runs on Arrow
+        compute kernels. Date columns are kept as strings there, so they are
+        parsed by DataCleaner exactly as with the default engine.
+
+        Args:
+            source (str or file): Path or file object of the raw CSV file.
+            file_name (str): Name of the raw file, used to detect the lender.
+            **kwargs: Extra arguments for pd.read_csv, e.g. chunksize or engine.
+
+        Returns:
+            DataFrame: The raw data (or a chunk iterator when chunksize is given).
+        """
+        header = pd.read_csv(source, nrows=0).columns
+        if hasattr(source, 'seek'):
+            source.seek(0)
+
+        matched_column_name = ColumnExtractor.match_lender_columns(file_name, [col.strip() for col in header])
+        usecols = list(header)
+        if matched_column_name:
+            usecols = [col for col in header if col.strip() in matched_column_name]
+            kwargs['usecols'] = usecols
+
+        if kwargs.get('chunksize') and 'dtype' not in kwargs:
+            kwargs['dtype'] = ColumnExtractor.infer_dtypes(source, **kwargs)
+            if hasattr(source, 'seek'):
+                source.seek(0)
+
+        if kwargs.get('engine') == 'pyarrow':
+            import pyarrow as pa
+            kwargs.setdefault('dtype_backend', 'pyarrow')
+            kwargs.setdefault('dtype', {
+                col: pd.ArrowDtype(pa.string()) for col in usecols if 'date' in col.strip().lower()
+            })
+        return pd.read_csv(source, **kwargs)
+
+    @staticmethod
+    def column_kind(values):
+        """
+        Classify a column of one chunk as pd.read_csv inferred it.
+
+        Args:
+            values (Series): The column.
+
+        Returns:
+            str: 'empty', 'bool', 'boolean' (booleans with blanks), 'int', 'float' or 'text'.
+        """
+        if values.isna().all():
+            return 'empty'
+        if pd.api.types.is_bool_dtype(values):
+            return 'bool'
+        if pd.api.types.is_integer_dtype(values):
+            return 'int'
+        if pd.api.types.is_float_dtype(values):
+            return 'float'
+        if pd.api.types.infer_dtype(values, skipna=True) == 'boolean':
+            return 'boolean'
+        return 'text'
+
+    @staticmethod
+    def infer_dtypes(source, **kwargs):
+        """
+        Find the dtype pd.read_csv gives each column when reading the whole file.
+
+        Read chunk by chunk, a column gets its own dtype in every chunk: a count
+        with blanks in one chunk is float there and int elsewhere, and a column
+        blank in the first chunk is float there and text later. The file is read
+        once in chunks and the kinds of each chunk are combined the way a single
+        read combines them: any text makes the column text, blanks or decimals
+        make numbers float.
+
+        Args:
+            source (str or file): Path or file object of the raw CSV file.
+            **kwargs: The pd.read_csv arguments of the chunked read, including chunksize.
+
+        Returns:
+            dict: Column name to dtype. Booleans with blanks are left out; pandas
+            reads them as objects, which no dtype reproduces.
+        """
+        kinds = {}
+        for chunk in pd.read_csv(source, **kwargs):
+            for column in chunk.columns:
+                kinds.setdefault(column, set()).add(ColumnExtractor.column_kind(chunk[column]))
+
+        dtypes = {}
+        for column, found in kinds.items():
+            if 'text' in found:
+                dtypes[column] = 'str'
+            elif found & {'bool', 'boolean'}:
+                if found == {'bool'}:
+                    dtypes[column] = 'bool'
+            elif found == {'int'}:
+                dtypes[column] = 'int64'
+            else:
+                dtypes[column] = 'float64'
+        return dtypes
+
+    def get_useful_columns(self, file_name, copy=True):
         """
         Get useful columns from the raw data using the standard and calculation files.
 
+        Args:
+            file_name (str): Name of the raw file, used to detect the lender.
+            copy (bool): Return a new frame and leave raw_df untouched. The pipeline passes
+                False for tapes it read itself, which are then stripped and used in place.
+
         Returns:
             DataFrame: A DataFrame containing the useful columns.
         """
-        barlowmarshall_column_names = [
-            "Borrower",
-            "Date Of Report",
-            "Advance B/F",
-            "Fixed Fee B/F",
-            "Total Client Receipts During Period",
-            "Client Share",
-            "BM Repayments",
-            "Principal Repayments",
-            "Fixed Fee Repayments",
-            "Cumilative BM Repayments",
-            "Of Which Principal",
-            "Of Which Fixed Fee",
-            "Principle Outstanding",
-            "Fixed Fee Outstanding",
-            "BM Principle Contribution Outstanding",
-            "Advance Date",
-            "Advance Made",
-            "Fixed Fee",
-            "Repayment Due",
-            "Advance Rate",
-            "Split Amount (<12 months)",
-            "Split Amount (>12 months)",
-            "Minimum Monthly Revenue",
-            "Loan Status",
-            "Sector",
-            "Renewal Number",
-            "Default Date",
-            "Default Amount"
-        ]
-
-
-        carmoola_column_names = [
-            "LOAN ID",
-            "OUTSTANDING PRINCIPAL BALANCE (£)",
-            "LOAN AMOUNT (£)",
-            "ORIGINAL DURATION OF LOAN",
-            "NUMBER OF DAYS IN ARREARS",
-            "PRODUCT",
-            "REGION",
-            "LOAN TO VALUE AT INCEPTION (%)",
-            "CREDIT SCORE",
-            "LIVE DATE",
-            "DEFAULT AMOUNT (£)",
-            "MERCHANT NAME",
-            "VEHICLE MAKE",
-            "VEHICLE MODEL",
-            "VEHICLE MODEL DERIVATIVE",
-            "GLASSES GUIDE RETAIL PRICE TRANSACTED (£)",
-            "CURRENT APR (%)",
-            "DEFAULT DATE",
-            "Is the loan eligible to be funded?",
-            "LOAN PRIMARY STATE",
-            "PURCHASE PRICE (£)",
-            "CASH DEPOSIT (£)",
-            "INTEREST CHARGES (£)",
-            "ORIGINAL MONTHLY REPAYMENT (£)",
-            "ARREARS START DATE",
-            "MATURITY DATE"
-        ]
-        ffy_column_names = [
-            "Agreement Number",
-            "Nationality",
-            "Customer Net Income",
-            "Years in Employment",
-            "Home Owner",
-            "Age Of Borrower",
-            "Customer Credit Score",
-            "Broker",
-            "Vehicle Make",
-            "Vehicle Model",
-            "Vehicle Age",
-            "Vehicle Fuel Type",
-            "Vehicle Mileage",
-            "Current Valuation",
-            "Loan Status",
-            "Start Date",
-            "Date Funded",
-            "Term",
-            "Remaining Term",
-            "Close Date",
-            "Lending Payment Frequency",
-            "Amount Financed",
-            "Deposit",
-            "Loan To Value",
-            "Annual Percentage Rate",
-            "Interest Received",
-            "Capital Received",
-            "Fees Received",
-            "Other Fees",
-            "Current Principle o/s",
-            "Arrears Amount",
-            "Payments in Arrears",
-            "Date Defaulted",
-            "Recoveries From Car Sale",
-            "Other Recoveries",
-            "Total Recoveries",
-            "Gross Balance Defaulted",
-            "Net Balance Defaulted",
-            "Principal Defaulted Balance",
-            "Net Principal Defaulted Balance",
-            "Qualified",
-            "Loan Eligibility Classification",
-            "Loan RPA Classification"
-        ]
-
-        ffysmart_column_names = [
-            "Agreement Number",
-            "Current Principle o/s",
-            "Amount Financed",
-            "Eligibility Summary",
-            "Term",
-            "Product",
-            "Customer Credit Score",
-            "Start Date",
-            "Annual Percentage Rate",
-            "Payment Frequency",
-            "Date Defaulted",
-            "Loan Status",
-            "Remaining Term_v1",
-            "Close Date",
-            "Fixed Contractual Repayment",
-            "Interest Received",
-            "Capital Received",
-            "Payments in Arrears",
-            "Last Payment Missed Date"
-        ]
-
-        fnpl_columbn_names = [
-            "Application Date",
-            "Contractual Monthly Instalment",
-            "Current Ltv",
-            "Final Statement Date",
-            "Settlement Date",
-            "Credit limit",
-            "Monthly repayment amount",
-            "Origination Date",
-            "Deposit %",
-            "Upfront Fee %",
-            "Account Code",
-            "Actual Closing Balance",
-            "Loan Amount",
-            "Loan_Term_v1",
-            "Days In Arrears",
-            "Product Name",
-            "Territory",
-            "Credit Score",
-            "Take On Date",
-            "Apr",
-            "Eligible?",
-            "Settlement Status",
-            "Channel",
-            "Currency",
-            "Settlement Amount"
-        ]
-
-        instrumentalCatalogue_column_names = [
-            "Unique Identifier for track",
-            "Artist",
-            "Original Advance Amount",
-            "Additional Recoupable Costs",
-            "Total Recoupable Costs",
-            "Currency",
-            "Contract Start Date",
-            "Advance Date",
-            "First Revenue Date",
-            "Contract Term (in Months)",
-            "Contracted Artist Split",
-            "Year 1 Expected Revenue",
-            "Year 2 Expected Revenue",
-            "Year 3 Expected Revenue",
-            "Year 4 Expected Revenue",
-            "Year 5 Expected Revenue",
-            "Total Gross Royalty Revenue Earned",
-            "Total Instrumental Split of Revenue",
-            "Total Artist Revenue",
-            "Total Revenue Paid to Artist",
-            "Total Expected Revenue to date",
-            "Actual to Expected Revenue",
-            "Total Outstanding Principal / Advance",
-            "Revenue Month (i.e. number of months receiving revenue)",
-            "EXCEPTION LOAN",
-            "ELIGIBILITY CRITERIA CHECK",
-            "STATUS",
-            "3/9 Month Average monthly collections",
-            "Remaining Term",
-            "Remaining PV Term",
-            "Future 3 / 5 yr Revenue",
-            "Revenue until Artist Recoups",
-            "Future Cashflows 3 / 5 years"
-        ]
-
-        instrumentalHotTracks_column_names = [
-            "Unique Identifier for track",
-            "Artist",
-            "Track name",
-            "Original Advance Amount",
-            "Additional Recoupable Costs",
-            "Total Recoupable Costs",
-            "Currency",
-            "Release Date",
-            "First Revenue Date",
-            "Contractual Artist Split",
-            "Contractual Artist Split After Recoupment",
-            "Contract Term (months)",
-            "1 Year Cum Expected Revenue",
-            "2 Year Cum Expected Revenue",
-            "3 Year Cum Expected Revenue",
-            "Number of Streams & YouTube Views (as of pool cut date)",
-            "Total Gross Royalty Revenue Earned",
-            "Total Instrumental Split of Revenue",
-            "Total Artist Revenue",
-            "Total Revenue Paid to Artist",
-            "Total Expected Revenue to date",
-            "Actual to Expected Revenue",
-            "Outstanding principal / advance",
-            "Revenue Month (i.e. number of months receiving revenue)",
-            "ELIGIBILITY CRITERIA CHECK",
-            "EXCEPTION LOAN",
-            "STATUS",
-            "Monthly Revenue Collected",
-            "3/9 Month Average monthly collections",
-            "Remaining Term",
-            "Remaining PV Term",
-            "Future Revenue",
-            "Revenue until Artist Recoups",
-            "Future Cashflows 3 years"
-        ]
-
-        instrumentalPerpetuityST_column_names = [
-            "Unique Identifier for track",
-            "Artist",
-            "Track name",
-            "Original Advance Amount",
-            "Additional Recoupable Costs",
-            "Total Recoupable Costs",
-            "Currency",
-            "Release Date",
-            "First Revenue Date",
-            "Contractual Artist Split",
-            "Contractual Artist Split After Recoupment",
-            "Contract Term (months)",
-            "1 Year Cum Expected Revenue",
-            "2 Year Cum Expected Revenue",
-            "3 Year Cum Expected Revenue",
-            "4 Year Expected Revenue",
-            "5 Year Expected Revenue",
-            "Number of Streams & YouTube Views (as of pool cut date)",
-            "Total Gross Royalty Revenue Earned",
-            "Total Instrumental Split of Revenue",
-            "Total Artist Revenue",
-            "Total Revenue Paid to Artist",
-            "Total Expected Revenue to date",
-            "Actual to Expected Revenue",
-            "Outstanding principal / advance",
-            "Revenue Month (i.e. number of months receiving revenue)",
-            "ELIGIBILITY CRITERIA CHECK",
-            "EXCEPTION LOAN",
-            "STATUS",
-            "Monthly Revenue Collected",
-            "3/9 Month Average monthly collections",
-            "Remaining PV Term",
-            "Future Revenue",
-            "Revenue until Artist Recoups",
-            "Future Cashflows 3 years"
-        ]
-
-        lantern_column_names = [
-            "Portfolio Name",
-            "Current 36m ERC Total",
-            "Purchase Price",
-            "Month Purchased",
-            "Withdrawn Portfolio"
-        ]
-
-        liberisEUCombinedbb_column_names = [
-            "Contract ID",
-            "Capital portion of balance",
-            "Advance Amount",
-            "Classification",
-            "Geographical Region",
-            "CUR",
-            "Contract Start Date",
-            "Current Renewal Number",
-            "Factor Rate",
-            "Industry",
-            "Contract Term",
-            "Latest transaction date",
-            "Days Paying",
-            "Expected Daily Pay",
-            "Average Daily Pay",
-            "Estimated Days Left",
-            "%_Paid_off",
-            "Amount_Left_£",
-            "Withholding percentage"
-        ]
-
-        liberisEUWos_column_names = [
-            "Contract ID",
-            "Capital portion of balance",
-            "Advance Amount",
-            "Geographical Region",
-            "CURR",
-            "Contract Start Date",
-            "Current Renerwal Number",
-            "Factor Rate",
-            "Industry",
-            "Contract Term",
-            "Latest transaction date",
-            "Date_written_off",
-            "Amount_written_off"
-        ]
-
-        liberisukbca_column_names = [
-            "Contract ID",
-            "Type",
-            "Region",
-            "Contract Start Date",
-            "Witholding Percentage",
-            "Advance Amount",
-            "Purchased Amount",
-            "Amount Left",
-            "Capital portion of balance",
-            "Factor Rate",
-            "Days_paying",
-            "Expected Daily Pay",
-            "Average Daily Pay",
-            "Contract Term (Days)",
-            "Estimated Days Left",
-            "% Paid off",
-            "Last Transaction Date",
-            "Current Renewal Number",
-            "% of Expectation",
-            "Credit score",
-            "Product Type",
-            "Classification",
-            "In borrowing base?"
-        ]
-
-        liberisukSecuritised_column_names = [
-            "Contract ID",
-            "Type",
-            "Region",
-            "Contract Start Date",
-            "Witholding Percentage",
-            "Advance Amount",
-            "Purchased Amount",
-            "Amount Left",
-            "Capital portion of balance",
-            "Factor Rate",
-            "Days_paying",
-            "Expected Daily Pay",
-            "Average Daily Pay",
-            "Contract Term (Days)",
-            "Estimated Days Left",
-            "% Paid off",
-            "Last Transaction Date",
-            "Current Renewal Number",
-            "% of Expectation",
-            "Credit score",
-            "Product Type",
-            "Classification",
-            "In borrowing base?"
-        ]
-
-        liberisukwos_column_names = [
-            "Industry",
-            "Contract Number Created",
-            "Contract Start Date",
-            "Witholding_Percentage",
-            "Advance Amount",
-            "Purchased Amount",
-            "Expected Daily Pay",
-            "Average Daily Pay",
-            "Days Paying",
-            "Current Renewal Number",
-            "Last Transaction Date",
-            "Date Written Off",
-            "Amount at Write Off",
-            "Capital portion of balance",
-            "Geographical Region",
-            "Factor Rate",
-            "Estimated Days Left"
-        ]
-
-
-        prodigyABS_column_names = [
-            "application_id",
-            "university_name",
-            "school_type",
-            "course_name",
-            "course_duration",
-            "application_margin",
-            "application_apr",
-            "application_first_repayment_date",
-            "series_name",
-            "repayment_period_months",
-            "application_total_admin_fee",
-            "series_currency",
-            "loan_original_grace_period_months",
-            "original_loan_term",
-            "loan_baserate",
-            "loan_baserate_type",
-            "loan_delinquency_status",
-            "loan_months_on_book",
-            "loan_total_disbursed_amount",
-            "loan_remaining_grace_period_months",
-            "loan_months_in_repayment",
-            "loan_remaining_repayment_period_months",
-            "loan_current_outstanding_balance",
-            "loan_principal_admin_balance",
-            "loan_interest_grace_balance",
-            "loan_interest_after_grace_balance",
-            "loan_remaining_term_months",
-            "loan_full_term_months",
-            "application_approved_amount",
-            "course_mba_flag",
-            "residence_at_application",
-            "course_type",
-            "loan_interest_rate_applied",
-            "Settled"
-        ]
-
-        prodigyDFC_column_names = [
-            "application_id",
-            "university_name",
-            "school_type",
-            "course_name",
-            "course_duration",
-            "application_margin",
-            "application_apr",
-            "application_first_repayment_date",
-            "series_name",
-            "repayment_period_months",
-            "application_total_admin_fee",
-            "series_currency",
-            "loan_original_grace_period_months",
-            "original_loan_term",
-            "loan_baserate",
-            "loan_baserate_type",
-            "loan_delinquency_status",
-            "loan_months_on_book",
-            "loan_total_disbursed_amount",
-            "loan_remaining_grace_period_months",
-            "loan_months_in_repayment",
-            "loan_remaining_repayment_period_months",
-            "loan_current_outstanding_balance",
-            "loan_principal_admin_balance",
-            "loan_interest_grace_balance",
-            "loan_interest_after_grace_balance",
-            "loan_remaining_term_months",
-            "loan_full_term_months",
-            "application_approved_amount",
-            "course_mba_flag",
-            "residence_at_application",
-            "course_type",
-            "loan_interest_rate_applied",
-            "Settled"
-        ]
-
-        prodigyWarehouse_column_names = [
-            "application_id",
-            "university_name",
-            "school_type",
-            "course_name",
-            "course_duration",
-            "application_margin",
-            "application_apr",
-            "application_first_repayment_date",
-            "series_name",
-            "repayment_period_months",
-            "application_total_admin_fee",
-            "series_currency",
-            "loan_original_grace_period_months",
-            "original_loan_term",
-            "loan_baserate",
-            "loan_baserate_type",
-            "loan_delinquency_status",
-            "loan_months_on_book",
-            "loan_total_disbursed_amount",
-            "loan_remaining_grace_period_months",
-            "loan_months_in_repayment",
-            "loan_remaining_repayment_period_months",
-            "loan_current_outstanding_balance",
-            "loan_principal_admin_balance",
-            "loan_interest_grace_balance",
-            "loan_interest_after_grace_balance",
-            "loan_remaining_term_months",
-            "loan_full_term_months",
-            "application_approved_amount",
-            "course_mba_flag",
-            "residence_at_application",
-            "course_type",
-            "loan_interest_rate_applied",
-            "Settled"
-        ]
-
-        liberisUSPortfolio_column_names = [
-            'Contract ID',
-            'Industry',
-            'Contract Start Date',
-            'Withholding Percentage',
-            'PP',
-            'PA',
-            'Amount Left',
-            'Capital Balance',
-            'Factor Rate',
-            'Days Paying',
-            'Exp Daily Pay',
-            'Avg Daily Pay',
-            '% Exp.',
-            'Term (Days)',
-            'Est Days Left',
-            'Last Tran.Date',
-            'Status',
-            'Current Renewal Number',
-            'Classification'
-        ]
-
-        liberisUSWOs_column_names = [
-            'Contract ID',
-            'Deal Start Date',
-            'WO Date',
-            'Contract Status',
-            'Sum of Amount Left',
-            'Sum of Purchased Amount'
-        ]
-
-        oakbrookares_column_names = [
-            'StartDate',
-            'LOB',
-            'APR',
-            'LoanTerm',
-            'LoanSize',
-            'AccountOriginationSource',
-            'DueMonthlyPayment',
-            'DelphiScore',
-            'BorrowerIncome',
-            'DebtToIncome',
-            'Region',
-            'Age',
-            'YearMonthStatus',
-            'MonthsOnBook',
-            'RemainingTerm',
-            'DQbucket',
-            'CumulativePrincipalDefault',
-            'DefaultYearMonth',
-            'PrincipalPayments',
-            'NonPrincipalPayments',
-            'PrincipalBalance',
-            'NonPrincipalBalance',
-            'Eligible',
-            'AgreementRef'
-        ]
-
-        oakbrookjpm_column_names = [
-            'StartDate',
-            'LOB',
-            'APR',
-            'LoanTerm',
-            'LoanSize',
-            'AccountOriginationSource',
-            'DueMonthlyPayment',
-            'DelphiScore',
-            'BorrowerIncome',
-            'DebtToIncome',
-            'Region',
-            'Age',
-            'YearMonthStatus',
-            'MonthsOnBook',
-            'RemainingTerm',
-            'DQbucket',
-            'CumulativePrincipalDefault',
-            'DefaultYearMonth',
-            'PrincipalPayments',
-            'NonPrincipalPayments',
-            'PrincipalBalance',
-            'NonPrincipalBalance',
-            'Eligible',
-            'AgreementRef'
-        ]
-
-        verdam_column_names = [
-            'UniqueLoanID',
-            'PurposeOfLoan',
-            'Employer',
-            'CreditScore',
-            'LoanStatus',
-            'LoanStartDate',
-            'AmountApproved',
-            'APRApproved',
-            'TermApproved',
-            'TermOutstanding',
-            'MonthlyPayment',
-            'TotalCapitalDue',
-            'TotalCapitalPaid',
-            'TotalInterestPaid',
-            'OutstandingBalance',
-            'BorrowerStatus',
-            'MaxArrears',
-            'MaxArrearsDate',
-            'Bucket',
-            'DelinquentEver',
-            'DelinquentEverDate',
-            'Seasoning',
-            'CCJ_LTM',
-            'DefaultBalance',
-            'SeniorLoanStatus',
-            'Servicer Fee',
-            'Default - Servicer Definition',
-            'DefaultEverDate',
-            'RecoveriesApplicableToWrittenOffBalance',
-            'Product',
-            'DelinquentAccountStatus'
-        ]
-
-        all_files = {
-                    'barlowmarshall' : barlowmarshall_column_names, 
-                    'carmoola' : carmoola_column_names,
-                    'ffy' : ffy_column_names,
-                    'ffysmart' : ffysmart_column_names,
-                    'fnpl' : fnpl_columbn_names,
-                    'instrumentalCatalogue' : instrumentalCatalogue_column_names,
-                    'instrumentalHotTracks' : instrumentalHotTracks_column_names,
-                    'instrumentalPerpetuityST' : instrumentalPerpetuityST_column_names,
-                    'lantern' : lantern_column_names,
-                    'liberisEUCombinedbb' : liberisEUCombinedbb_column_names,
-                    'liberisEUWos' : liberisEUWos_column_names,
-                    'liberisukbca' : liberisukbca_column_names,
-                    'liberisukSecuritised' : liberisukSecuritised_column_names,
-                    'liberisukwos' : liberisukwos_column_names,
-                    'prodigyABS' : prodigyABS_column_names,
-                    'prodigyDFC' : prodigyDFC_column_names,
-                    'prodigyWarehouse' : prodigyWarehouse_column_names,
-                    'liberisUSPortfolio' : liberisUSPortfolio_column_names,
-                    'liberisUSWOs' : liberisUSWOs_column_names,
-                    'oakbrookares' : oakbrookares_column_names,
-                    'oakbrookjpm' : oakbrookjpm_column_names,
-                    'verdam' : verdam_column_names
-                }
-        
-        extracted_name = file_name[:file_name.find("_")].lower()
-
-        # Print the extracted name
-        # print(extracted_name)  # Output: LiberisUSPortfolio
-        self.raw_df.columns = [col.strip() for col in self.raw_df.columns]
-        column_names = self.raw_df.columns.tolist()
+        column_names = [col.strip() for col in self.raw_df.columns]
 
         # Create a dictionary to store prefixes as keys and column names as values
         matched_column_name = []
         try:
         # Your existing code to extract the file name and check for a match
-            for key, value in all_files.items():
-                if extracted_name == key.lower():
-                    matched_column_name = value
-                    break
+            matched_column_name = self.match_lender_columns(file_name, column_names)
 
             if not matched_column_name :
                 matched_column_name = column_names
@@ -694,9 +218,11 @@ class ColumnExtractor:
 
         
 
-        common_columns = list(set(column_names).intersection(set(matched_column_name)))
+        # Keep the raw file's column order so every run and every chunk has the same layout
+        matched_set = frozenset(matched_column_name)
+        common_columns = [col for col in column_names if col in matched_set]
         # Get a list of all columns in the raw data
-        list_full = self.raw_df.columns.tolist()
+        list_full = column_names
 
         
         # we will use this dictionary in hardcoded_fields file to update the new columns in our dataframe which are hardcoded or calculated or are null
@@ -706,10 +232,22 @@ class ColumnExtractor:
         # Get the common columns between filtered_list and the raw data columns
         # common_columns = list(set(filtered_list).intersection(list_full))
 
-        filtered_dict = {key: value for key, value in data_dict.items() if value not in common_columns}
-
-        # Create the final DataFrame with useful columns
-        df_final = self.raw_df[common_columns]
+        common_set = frozenset(common_columns)
+        filtered_dict = {key: value for key, value in data_dict.items() if value not in common_set}
+
+        # Create the final DataFrame with useful columns. The later stages change it in place,
+        # so a caller's frame is copied; a tape the pipeline read itself with read_useful_columns
+        # already holds exactly these columns and is used as it is
+        if copy:
+            positions = [position for position, col in enumerate(column_names) if col in matched_set]
+            df_final = self.raw_df.iloc[:, positions].copy()
+            df_final.columns = common_columns
+        else:
+            self.raw_df.columns = column_names
+            if common_columns == list_full:
+                df_final = self.raw_df
+            else:
+                df_final = self.raw_df[common_columns]
 
         return df_final, filtered_dict
 
@@ -0,0 +1,100 @@
+import hashlib
+import json
+from contextlib import contextmanager
+import os
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_CACHE_PATH = os.getenv('FORMULA_CACHE_PATH', '.formula_cache.sqlite')
+
+
+class FormulaCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=5000):
+        """
+        Initialize the FormulaCache class.
+
+        Entries are content addressed: the key is a hash of the model, the prompt
+        and the spreadsheet expression, so changing any of them is a cache miss.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            max_entries (int): Number of entries kept before the least recently used are evicted.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        with self.connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS formulas ("
+                "key TEXT PRIMARY KEY, code TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(model, prompt, expression):
+        """
+        Build the cache key for an expression.
+
+        Args:
+            model (str): The model name.
+            prompt (str): The full prompt sent with the expression.
+            expression (str): The spreadsheet expression.
+
+        Returns:
+            str: A sha256 hex digest.
+        """
+        payload = json.dumps([model, prompt, expression], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Look up converted code, marking the entry as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            str: The cached python code, or None on a miss.
+        """
+        with self.lock, self.connect() as conn:
+            row = conn.execute("SELECT code FROM formulas WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE formulas SET last_used = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def set(self, key, code):
+        """
+        Store converted code and evict the least recently used entries over the limit.
+
+        Args:
+            key (str): The cache key.
+            code (str): The converted python code.
+        """
+        with self.lock, self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO formulas (key, code, last_used) VALUES (?, ?, ?)",
+                (key, code, time.time())
+            )
+            conn.execute(
+                "DELETE FROM formulas WHERE key NOT IN "
+                "(SELECT key FROM formulas ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        """
+        Remove every cached entry.
+        """
+        with self.lock, self.connect() as conn:
+            conn.execute("DELETE FROM formulas")
@@ -0,0 +1,321 @@
+import ast
+import re
+
+
+class FormulaSyntaxError(ValueError):
+    """
+    Raised when a spreadsheet expression cannot be compiled locally.
+    """
+
+
+TOKEN_PATTERN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)
+  | (?P<string>"(?:[^"]|"")*")
+  | (?P<quoted>'(?:[^']|'')*')
+  | (?P<bracketed>\[[^\]]*\])
+  | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+  | (?P<op><>|<=|>=|[-+*/^&%=<>(),])
+''', re.VERBOSE)
+
+COMPARISON_OPERATORS = {'=': '==', '<>': '!=', '<': '<', '>': '>', '<=': '<=', '>=': '>='}
+
+# Node kinds: 'num' and 'str' literals, 'bool' literal, 'col' column reference,
+# 'mask' boolean Series, 'number' numeric expression, 'text' concatenated text,
+# 'value' anything else.
+NUMERIC_KINDS = ('num', 'number')
+TEXT_KINDS = ('str', 'text')
+LITERAL_KINDS = ('str', 'num', 'bool')
+
+
+class Node:
+    def __init__(self, kind, code, name=None):
+        self.kind = kind
+        self.code = code
+        # Column name, for 'col' nodes
+        self.name = name
+
+
+class FormulaCompiler:
+    """
+    Compile simple spreadsheet expressions (IF/AND/OR/NOT, comparisons and
+    arithmetic) into column-wise pandas/NumPy code.
+
+    The generated code follows the same contract as the LLM output: it runs
+    with `df_mapped`, `np` and `pd` in scope and assigns the column to `result`.
+    Anything outside the supported grammar raises FormulaSyntaxError so the
+    caller can fall back to the LLM.
+    """
+
+    def compile(self, expression):
+        """
+        Compile a spreadsheet expression into python code.
+
+        Args:
+            expression (str): The spreadsheet expression, with or without a leading '='.
+
+        Returns:
+            str: Python code assigning the computed column to `result`.
+        """
+        if not isinstance(expression, str) or not expression.strip():
+            raise FormulaSyntaxError(f"Not an expression: {expression!r}")
+        self.tokens = self.tokenize(expression.strip().lstrip('='))
+        self.pos = 0
+        node = self.parse_comparison()
+        if self.pos != len(self.tokens):
+            raise FormulaSyntaxError(f"Unexpected token {self.tokens[self.pos][1]!r}")
+        code = f"result = {node.code}"
+        compile(code, '<formula>', 'exec')
+        return code
+
+    @staticmethod
+    def tokenize(expression):
+        tokens = []
+        pos = 0
+        while pos < len(expression):
+            match = TOKEN_PATTERN.match(expression, pos)
+            if match is None:
+                raise FormulaSyntaxError(f"Unexpected character {expression[pos]!r}")
+            pos = match.end()
+            kind = match.lastgroup
+            if kind != 'space':
+                tokens.append((kind, match.group()))
+        return tokens
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if token[0] is None or (value is not None and token[1] != value):
+            raise FormulaSyntaxError(f"Expected {value or 'a token'}, got {token[1]!r}")
+        self.pos += 1
+        return token
+
+    # Grammar, lowest precedence first: comparison, concatenation, +/-, * and /, ^, unary, primary
+
+    def parse_comparison(self):
+        left = self.parse_concat()
+        while self.peek()[0] == 'op' and self.peek()[1] in COMPARISON_OPERATORS:
+            operator = COMPARISON_OPERATORS[self.take()[1]]
+            right = self.parse_concat()
+            left = self.comparison(left, operator, right)
+        return left
+
+    def comparison(self, left, operator, right):
+        """
+        Code for a comparison, following spreadsheet semantics:
+
+        - next to a number, columns are compared as numbers
+        - next to text, or between two columns with = and <>, text is compared ignoring case
+        - two columns are ordered (<, >, <=, >=) as numbers, since cleaned amounts and
+          rates are text; two date columns hold ISO dates, which order correctly as text
+        """
+        ordering = operator not in ('==', '!=')
+        columns = left.kind == right.kind == 'col'
+        if left.kind in NUMERIC_KINDS or right.kind in NUMERIC_KINDS:
+            numeric = True
+        elif columns and ordering:
+            numeric = not (self.is_date(left) and self.is_date(right))
+            if not numeric:
+                return Node('mask', f"({left.code} {operator} {right.code})")
+        else:
+            numeric = False
+        textual = {left.kind, right.kind} <= {'col', 'str', 'text'} and (columns or left.kind in TEXT_KINDS
+                                                                           or right.kind in TEXT_KINDS)
+        if not numeric and textual:
+            return Node('mask', f"({self.casefold(left)} {operator} {self.casefold(right)})")
+        return Node('mask', f"({self.operand(left, numeric)} {operator} {self.operand(right, numeric)})")
+
+    def parse_concat(self):
+        left = self.parse_additive()
+        while self.peek() == ('op', '&'):
+            self.take()
+            right = self.parse_additive()
+            if left.kind in LITERAL_KINDS and right.kind in LITERAL_KINDS:
+                # Literals are joined here, so 'text' nodes always hold a Series
+                value = ast.literal_eval(self.as_text(left)) + ast.literal_eval(self.as_text(right))
+                left = Node('str', repr(value))
+            else:
+                left = Node('text', f"({self.as_text(left)} + {self.as_text(right)})")
+        return left
+
+    def parse_additive(self):
+        left = self.parse_term()
+        while self.peek()[0] == 'op' and self.peek()[1] in ('+', '-'):
+            operator = self.take()[1]
+            right = self.parse_term()
+            left = self.arithmetic(left, operator, right)
+        return left
+
+    def parse_term(self):
+        left = self.parse_power()
+        while self.peek()[0] == 'op' and self.peek()[1] in ('*', '/'):
+            operator = self.take()[1]
+            right = self.parse_power()
+            left = self.arithmetic(left, operator, right)
+        return left
+
+    def parse_power(self):
+        left = self.parse_unary()
+        while self.peek() == ('op', '^'):
+            self.take()
+            right = self.parse_unary()
+            left = self.arithmetic(left, '**', right)
+        return left
+
+    def parse_unary(self):
+        if self.peek()[0] == 'op' and self.peek()[1] in ('-', '+'):
+            operator = self.take()[1]
+            operand = self.parse_unary()
+            if operand.kind == 'num':
+                # A signed literal stays a literal, e.g. the digits of ROUND(x, -2)
+                return Node('num', operand.code if operator == '+' else f"(-{operand.code})")
+            return Node('number', f"({operator}{self.operand(operand, True)})")
+        node = self.parse_primary()
+        if self.peek() == ('op', '%'):
+            self.take()
+            node = Node('number', f"({self.operand(node, True)} / 100)")
+        return node
+
+    def parse_primary(self):
+        kind, value = self.take()
+        if kind == 'number':
+            return Node('num', value)
+        if kind == 'string':
+            return Node('str', repr(value[1:-1].replace('""', '"')))
+        if kind == 'quoted':
+            return self.column(value[1:-1].replace("''", "'"))
+        if kind == 'bracketed':
+            return self.column(value[1:-1])
+        if kind == 'op' and value == '(':
+            node = self.parse_comparison()
+            self.take(')')
+            return node
+        if kind == 'name':
+            if self.peek() == ('op', '('):
+                return self.parse_function(value.upper())
+            if value.upper() in ('TRUE', 'FALSE'):
+                return Node('bool', str(value.upper() == 'TRUE'))
+            return self.column(value)
+        raise FormulaSyntaxError(f"Unexpected token {value!r}")
+
+    def parse_arguments(self):
+        self.take('(')
+        args = []
+        if self.peek() != ('op', ')'):
+            args.append(self.parse_comparison())
+            while self.peek() == ('op', ','):
+                self.take()
+                args.append(self.parse_comparison())
+        self.take(')')
+        return args
+
+    def parse_function(self, name):
+        args = self.parse_arguments()
+        if name == 'IF' and len(args) in (2, 3):
+            condition = self.as_mask(args[0])
+            if_true = args[1]
+            if_false = args[2] if len(args) == 3 else Node('bool', 'False')
+            return Node('value', f"np.where({condition}, {self.branch(if_true, if_false)}, {self.branch(if_false, if_true)})")
+        if name in ('AND', 'OR') and args:
+            operator = ' & ' if name == 'AND' else ' | '
+            return Node('mask', '(' + operator.join(self.as_mask(arg) for arg in args) + ')')
+        if name == 'NOT' and len(args) == 1:
+            return Node('mask', f"(~{self.as_mask(args[0])})")
+        if name == 'ISBLANK' and len(args) == 1:
+            return Node('mask', f"pd.isna({args[0].code})")
+        if name == 'ABS' and len(args) == 1:
+            return Node('number', f"np.abs({self.operand(args[0], True)})")
+        if name == 'ROUND' and len(args) in (1, 2):
+            digits = args[1].code if len(args) == 2 else '0'
+            if len(args) == 2 and args[1].kind != 'num':
+                raise FormulaSyntaxError("ROUND digits must be a number")
+            # Spreadsheets round halves away from zero (np.round rounds them to even); the
+            # scaled value is rounded to 9 decimals first so 2.675 * 100 counts as a half
+            scale = 10 ** int(ast.literal_eval(digits))
+            return Node('number', f"(lambda value: np.sign(value) * np.floor(np.round(np.abs(value) * {scale}, 9) + 0.5)"
+                                  f" / {scale})({self.operand(args[0], True)})")
+        if name in ('MIN', 'MAX') and args:
+            function = 'np.fmin' if name == 'MIN' else 'np.fmax'
+            code = self.operand(args[0], True, blank_as_zero=False)
+            for arg in args[1:]:
+                code = f"{function}({code}, {self.operand(arg, True, blank_as_zero=False)})"
+            return Node('number', code)
+        raise FormulaSyntaxError(f"Unsupported function {name} with {len(args)} arguments")
+
+    # Code generation helpers
+
+    @staticmethod
+    def column(name):
+        return Node('col', f"df_mapped[{name.strip()!r}]", name.strip())
+
+    @staticmethod
+    def is_date(node):
+        return node.kind == 'col' and 'date' in node.name.casefold()
+
+    @staticmethod
+    def casefold(node):
+        """
+        Code for a text operand compared ignoring case, as spreadsheets compare text.
+        """
+        if node.kind == 'str':
+            return repr(ast.literal_eval(node.code).casefold())
+        if node.kind == 'col':
+            return f"{node.code}.fillna('').astype(str).str.casefold()"
+        return f"{node.code}.str.casefold()"
+
+    @staticmethod
+    def operand(node, numeric, blank_as_zero=True):
+        """
+        Code for a node used in a numeric or plain context; columns are coerced
+        to numbers when compared or combined with numbers. Blank cells count as
+        0 there, as in a spreadsheet, unless blank_as_zero is False (MIN and MAX
+        skip them); text that is not a number becomes NaN.
+        """
+        if node.kind == 'col' and numeric:
+            values = f"{node.code}.fillna(0)" if blank_as_zero else node.code
+            return f"pd.to_numeric({values}, errors='coerce')"
+        if node.kind == 'str' and numeric:
+            raise FormulaSyntaxError("Cannot mix text and numbers")
+        return node.code
+
+    def arithmetic(self, left, operator, right):
+        return Node('number', f"({self.operand(left, True)} {operator} {self.operand(right, True)})")
+
+    def as_mask(self, node):
+        if node.kind in ('mask', 'bool'):
+            return node.code
+        if node.kind == 'str':
+            raise FormulaSyntaxError("Text used as a condition")
+        if node.kind == 'col':
+            return f"(pd.to_numeric({node.code}, errors='coerce').fillna(0) != 0)"
+        return f"({node.code} != 0)"
+
+    @staticmethod
+    def as_text(node):
+        if node.kind in ('str', 'text'):
+            return node.code
+        if node.kind == 'num' and node.code.startswith('('):
+            # A signed literal, e.g. (-2)
+            return repr(str(ast.literal_eval(node.code)))
+        if node.kind in ('num', 'bool'):
+            return repr(node.code)
+        if node.kind == 'col':
+            return f"{node.code}.fillna('').astype(str)"
+        raise FormulaSyntaxError("Only columns and literals can be concatenated")
+
+    @staticmethod
+    def branch(node, other):
+        """
+        Code for an IF branch. A text or TRUE/FALSE literal next to a branch of
+        another kind is kept as an object scalar, so np.where does not turn
+        numbers and NaN into text or FALSE into 0.
+        """
+        if node.kind == 'str' and other.kind != 'str':
+            return f"np.asarray({node.code}, dtype=object)"
+        if node.kind == 'bool' and other.kind not in ('bool', 'mask'):
+            return f"np.asarray({node.code}, dtype=object)"
+        return node.code
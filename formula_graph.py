@@ -0,0 +1,70 @@
+import ast
+
+
+class FormulaGraph:
+    def __init__(self, formulas):
+        """
+        Initialize the FormulaGraph class.
+
+        Args:
+            formulas (dict): A dictionary mapping calculated field names to python code.
+        """
+        self.formulas = formulas
+        self.dependencies = {
+            key: (self.referenced_columns(source) & set(formulas)) - {key}
+            for key, source in formulas.items()
+        }
+
+    @staticmethod
+    def referenced_columns(source):
+        """
+        Find the column names a formula reads, e.g. row['X'], df_mapped['X'] or row.get('X').
+
+        Args:
+            source (str): The python code of the formula.
+
+        Returns:
+            set: The referenced column names.
+        """
+        try:
+            tree = ast.parse(source)
+        except (SyntaxError, ValueError, TypeError):
+            return set()
+
+        columns = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Subscript):
+                index = node.slice
+                if isinstance(index, ast.Constant) and isinstance(index.value, str):
+                    columns.add(index.value)
+                elif isinstance(index, (ast.List, ast.Tuple)):
+                    columns.update(
+                        element.value for element in index.elts
+                        if isinstance(element, ast.Constant) and isinstance(element.value, str)
+                    )
+            elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'get':
+                if node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str):
+                    columns.add(node.args[0].value)
+        return columns
+
+    def levels(self):
+        """
+        Group the fields into levels in topological order. Every field only depends
+        on fields from earlier levels, so the fields of one level can run concurrently.
+
+        Returns:
+            tuple: A list of levels (lists of field names, in the original order),
+            and a list of field names caught in a circular reference.
+        """
+        remaining = dict(self.dependencies)
+        done = set()
+        levels = []
+        while remaining:
+            ready = [key for key, deps in remaining.items() if deps <= done]
+            if not ready:
+                break
+            levels.append(ready)
+            done.update(ready)
+            for key in ready:
+                del remaining[key]
+        return levels, list(remaining)
@@ -0,0 +1,268 @@
+import multiprocessing
+import os
+import pickle
+import shutil
+import signal
+import tempfile
+import threading
+import pandas as pd
+from hardcoded_fields import HardcodeColumns
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Shared memory on Linux; frames written here never touch the disk
+SHARED_MEMORY_DIR = '/dev/shm'
+
+# Modules the fork server imports once, so every formula process starts with them loaded
+PRELOAD_MODULES = ['numpy', 'pandas', 'pyarrow', 'hardcoded_fields']
+
+
+class FormulaError(Exception):
+    """A calculated field failed, ran out of time or memory in its worker process."""
+
+
+class SharedFrame:
+    """
+    Write the working DataFrame once so formula processes can read it without pickling.
+
+    The frame is written to an Arrow IPC file, which each process memory-maps.
+    Object columns holding only text (with missing values) are written as Arrow
+    strings and turned back into object columns when loaded. Only columns mixing
+    types (e.g. numbers and text) have no faithful Arrow type; they are pickled
+    to a side file and put back in place. Formulas see the same values and
+    dtypes as in the main process.
+    """
+
+    def __init__(self, df):
+        """
+        Initialize the SharedFrame class.
+
+        Parameters:
+        - df (DataFrame): The working DataFrame the formulas read.
+        """
+        import pyarrow as pa
+
+        directory = SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) else None
+        self.directory = tempfile.mkdtemp(prefix='formulas-', dir=directory)
+        self.path = os.path.join(self.directory, 'frame.arrow')
+        self.columns = list(df.columns)
+
+        objects = [column for column in self.columns if df[column].dtype == object]
+        mixed = [
+            column for column in objects
+            if pd.api.types.infer_dtype(df[column], skipna=True) not in ('string', 'empty')
+        ]
+        text = [column for column in objects if column not in mixed]
+        table = pa.Table.from_pandas(df.drop(columns=mixed), preserve_index=True)
+        with pa.OSFile(self.path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        with open(f"{self.path}.pkl", 'wb') as f:
+            pickle.dump((self.columns, text, df[mixed]), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        """
+        Read a shared frame in a formula process.
+
+        Parameters:
+        - path (str): The path of the Arrow IPC file.
+
+        Returns:
+        - DataFrame: The working DataFrame, with its index and column order.
+        """
+        import pyarrow as pa
+
+        with pa.memory_map(path) as source:
+            df = pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+        with open(f"{path}.pkl", 'rb') as f:
+            columns, text, mixed = pickle.load(f)
+        for column in text:
+            df[column] = df[column].astype(object)
+        for column in mixed.columns:
+            df[column] = mixed[column]
+        return df[columns] if list(df.columns) != columns else df
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def address_space():
+    """
+    Get the virtual memory size of the current process.
+
+    Returns:
+    - int: Size in bytes, or None when /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def cpu_time_exceeded(signum, frame):
+    raise FormulaError("CPU time limit exceeded")
+
+
+def set_limits(cpu_time, memory_limit):
+    """
+    Limit the CPU time and memory of the current process.
+
+    The memory limit is added to the address space already in use (the
+    interpreter, the libraries and the mapped frame), so it bounds what the
+    formula itself allocates.
+
+    Parameters:
+    - cpu_time (int): CPU seconds; SIGXCPU raises FormulaError, and the process is killed a second later.
+    - memory_limit (int): Bytes the formula may allocate.
+    """
+    if resource is None:
+        return
+    if cpu_time:
+        signal.signal(signal.SIGXCPU, cpu_time_exceeded)
+        used = int(resource.getrusage(resource.RUSAGE_SELF).ru_utime + resource.getrusage(resource.RUSAGE_SELF).ru_stime)
+        resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_time, used + cpu_time + 1))
+    current = address_space()
+    if memory_limit and current is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (current + memory_limit, current + memory_limit))
+
+
+def run_formula(source, frame_path, conn, cpu_time, memory_limit):
+    """
+    Run one formula in a sandbox process and send its result back.
+
+    Parameters:
+    - source (str): The python code of the formula.
+    - frame_path (str): The SharedFrame holding the working DataFrame.
+    - conn (Connection): Pipe end receiving ('ok', result) or ('error', message).
+    - cpu_time (int): CPU seconds allowed.
+    - memory_limit (int): Bytes the formula may allocate.
+    """
+    try:
+        df_mapped = SharedFrame.load(frame_path)
+        set_limits(cpu_time, memory_limit)
+        namespace = HardcodeColumns.formula_namespace(df_mapped)
+        exec(HardcodeColumns.compile_formula(source), namespace)
+        message = ('ok', namespace.get('result', 'N/A'))
+    except MemoryError:
+        message = ('error', "memory limit exceeded")
+    except Exception as e:
+        message = ('error', str(e))
+    try:
+        conn.send(message)
+    except MemoryError:
+        conn.send(('error', "memory limit exceeded"))
+    except Exception as e:
+        conn.send(('error', f"result could not be returned: {e}"))
+    finally:
+        conn.close()
+
+
+class FormulaSandbox:
+    """
+    Run calculated fields in separate processes with time and memory limits.
+
+    Every formula runs in a fresh process started from a fork server that has
+    pandas and numpy already imported. It reads the working frame from a
+    SharedFrame and sends back only its result column. A formula that loops
+    forever, uses too much CPU time or allocates too much memory is stopped
+    without affecting the calling process, and HardcodeColumns reports it like
+    any other failing formula: "Error for key '<field>': <reason>".
+    """
+
+    def __init__(self, max_workers=None, timeout=60, cpu_time=None, memory_limit=None):
+        """
+        Initialize the FormulaSandbox class.
+
+        Parameters:
+        - max_workers (int): Formula processes running at once, defaults to the number of cores.
+        - timeout (float): Wall-clock seconds a formula may run before its process is killed.
+        - cpu_time (int): CPU seconds a formula may use, defaults to the timeout.
+        - memory_limit (int): MiB a formula may allocate on top of the loaded frame; None for no limit.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.cpu_time = cpu_time or (int(timeout) + 1 if timeout else None)
+        self.memory_limit = memory_limit
+        self.slots = threading.BoundedSemaphore(self.max_workers)
+
+    @staticmethod
+    def context():
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(PRELOAD_MODULES)
+            return context
+        return multiprocessing.get_context('spawn')
+
+    def share(self, df_mapped):
+        """
+        Share the working DataFrame with the formula processes of one level.
+
+        Parameters:
+        - df_mapped (DataFrame): The DataFrame the formulas read.
+
+        Returns:
+        - SharedFrame: Context manager removing the shared files on exit.
+        """
+        return SharedFrame(df_mapped)
+
+    def evaluate(self, source, frame):
+        """
+        Run one formula in a sandbox process.
+
+        Parameters:
+        - source (str): The python code of the formula.
+        - frame (SharedFrame): The shared working DataFrame.
+
+        Returns:
+        - The value of the formula's 'result' variable.
+
+        Raises:
+        - FormulaError: When the formula fails, times out or exceeds its limits.
+        """
+        memory_limit = self.memory_limit * 2 ** 20 if self.memory_limit else None
+        context = self.context()
+        with self.slots:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=run_formula,
+                                      args=(source, frame.path, sender, self.cpu_time, memory_limit), daemon=True)
+            process.start()
+            sender.close()
+            try:
+                if not receiver.poll(self.timeout):
+                    process.kill()
+                    raise FormulaError(f"timed out after {self.timeout} seconds")
+                status, value = receiver.recv()
+            except EOFError:
+                # The process died without sending a result, e.g. killed at the hard CPU limit
+                process.join()
+                if process.exitcode in (-signal.SIGXCPU, -signal.SIGKILL):
+                    raise FormulaError("CPU time or memory limit exceeded")
+                raise FormulaError(f"formula process exited with code {process.exitcode}")
+            finally:
+                receiver.close()
+                process.join()
+        if status == 'error':
+            raise FormulaError(value)
+        return value
+
+    def __getstate__(self):
+        # Semaphores cannot be pickled, e.g. when a pipeline is sent to a batch worker
+        state = dict(self.__dict__)
+        del state['slots']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.slots = threading.BoundedSemaphore(self.max_workers)
@@ -1,43 +1,170 @@
+import builtins
+import functools
+import hashlib
 import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from constant_columns import constant_column
+from formula_graph import FormulaGraph
+from instrumentation import StageRecord
+
+
+# Compiled formulas kept across runs and tapes; the least recently used are dropped beyond this
+MAX_COMPILED_FORMULAS = 1024
 
 
 class HardcodeColumns:
+    def __init__(self, max_workers=None, instrumentation=None, tape=None, sandbox=None):
+        """
+        Initialize the HardcodeColumns class.
+
+        Parameters:
+        - max_workers (int): Number of independent calculated fields evaluated concurrently.
+        - instrumentation (Instrumentation): Records the time of each calculated field when given.
+        - tape (str): Name of the raw file, attached to the field records.
+        - sandbox (FormulaSandbox): Runs each formula in a separate process with time and memory
+          limits when given, instead of in this process.
+        """
+        self.max_workers = max_workers
+        self.instrumentation = instrumentation
+        self.tape = tape
+        self.sandbox = sandbox
+
+    @staticmethod
+    @functools.lru_cache(maxsize=MAX_COMPILED_FORMULAS)
+    def compile_formula(source):
+        """
+        Compile formula source once and reuse the code object while it is among
+        the MAX_COMPILED_FORMULAS most recently used.
+
+        Parameters:
+        - source (str): The python code of the formula.
+
+        Returns:
+        - code: The compiled code object.
+        """
+        key = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        return compile(source, f"<formula {key[:12]}>", 'exec')
+
+    @staticmethod
+    def formula_namespace(df_mapped):
+        """
+        Build a fresh namespace for one formula, exposing only the names formulas may use.
+
+        Parameters:
+        - df_mapped (DataFrame): The DataFrame the formula reads from.
+
+        Returns:
+        - dict: The namespace passed to exec.
+        """
+        return {'__builtins__': builtins, 'df_mapped': df_mapped, 'np': np, 'pd': pd}
+
+    def evaluate(self, key, formulas_dict, df_mapped, frame=None):
+        """
+        Run the formula of one calculated field.
+
+        Parameters:
+        - key (str): The calculated field name.
+        - formulas_dict (dict): A dictionary mapping field names to python code.
+        - df_mapped (DataFrame): The DataFrame the formula reads from.
+        - frame (SharedFrame): df_mapped as shared with the sandbox processes, when sandboxed.
 
+        Returns:
+        - The computed column, or the error message when the formula fails.
+        """
+        if self.instrumentation is None:
+            measure = nullcontext(StageRecord(key, self.tape))
+        else:
+            measure = self.instrumentation.field(key, self.tape)
+        with measure as record:
+            try:
+                if frame is not None:
+                    result = self.sandbox.evaluate(formulas_dict[key], frame)
+                else:
+                    namespace = self.formula_namespace(df_mapped)
+                    exec(self.compile_formula(formulas_dict[key]), namespace)
+                    # Retrieve the 'result' variable from the formula's namespace
+                    result = namespace.get('result', 'N/A')
+                if not isinstance(result, str) and np.ndim(result):
+                    record.rows = len(result)
+                return result
+            except Exception as e:
+                # Handle the exception here, e.g., log the error message
+                print(f"Error for key '{key}': {str(e)}")
+                record.error = str(e)
+                return f"Error for key '{key}': {str(e)}"
 
-    def process_values(self, data_dict, df_mapped, formulas_dict):
+    def process_values(self, data_dict, df_mapped, formulas_dict, constants=None):
         """
         Process the values in the DataFrame based on the provided dictionary.
 
-        - If a value is 'Calculation', it is replaced with 'WILLDO'.
+        - If a value is 'Calculation', the column is computed from its formula.
         - If a value is '-', it is replaced with NaN (null).
         - For other values, they are assigned to all rows for the corresponding column.
 
+        Hardcoded and null fields are assigned first. Calculated fields are then
+        evaluated once each, in dependency order, so a formula can use another
+        calculated column; fields that do not depend on each other run concurrently.
+
+        Hardcoded and null fields that no formula reads are stored as single-category
+        Categoricals, or, when constants is given, recorded there and left out of the
+        DataFrame until ConstantColumns.expand adds them back. Fields a formula reads
+        are assigned to every row as before, so formulas see the same values and dtypes.
+
+        Parameters:
+        - data_dict (dict): Standard field names to their value, '-' or 'Calculation'.
+        - df_mapped (DataFrame): The cleaned DataFrame, changed in place.
+        - formulas_dict (dict): A dictionary mapping field names to python code.
+        - constants (ConstantColumns): Receives the hardcoded and null fields instead of the DataFrame when given.
+
         Returns:
         - DataFrame: The DataFrame with updated values.
         """
+        column_order = list(df_mapped.columns) + [key for key in data_dict if key not in df_mapped.columns]
+
+        calculated = {key: formulas_dict.get(key) for key, value in data_dict.items() if value == 'Calculation'}
+        referenced = set()
+        for source in calculated.values():
+            referenced |= FormulaGraph.referenced_columns(source)
 
-        for key, value in  data_dict.items():
+        for key, value in data_dict.items():
             if value == 'Calculation':
-                try:
-                    local_vars = locals()
-                    
-                    exec(formulas_dict[key], globals(), local_vars)
-                    print('try success')
-                    # Retrieve the 'result' variable from the local context
-                    result = local_vars.get('result', 'N/A')
-                    
-                    # Assign the result to the DataFrame column
-                    df_mapped[key] = result
-                except Exception as e:
-                    # Handle the exception here, e.g., log the error message
-                    print(f"Error for key '{key}': {str(e)}")
-                    df_mapped[key] = f"Error for key '{key}': {str(e)}"
-            elif value == '-':
-                df_mapped[key] = np.nan
-            else:
+                continue
+            value = np.nan if value == '-' else value
+            if key in referenced:
                 # Assign the value to all rows for the current key
                 df_mapped[key] = value
+            elif constants is not None:
+                constants.values[key] = value
+                if key in df_mapped.columns:
+                    del df_mapped[key]
+            else:
+                df_mapped[key] = constant_column(value, df_mapped.index)
+        if constants is not None:
+            constants.column_order = column_order
+            column_order = [column for column in column_order if column not in constants.values]
 
-        return df_mapped
-    
+        levels, circular = FormulaGraph(calculated).levels()
+        for key in circular:
+            print(f"Error for key '{key}': circular reference between calculated fields")
+            df_mapped[key] = f"Error for key '{key}': circular reference between calculated fields"
+
+        for level in levels:
+            # Sandboxed formulas read the frame as it is at the start of their level
+            with self.sandbox.share(df_mapped) if self.sandbox is not None else nullcontext() as frame:
+                if len(level) == 1 or self.max_workers == 1:
+                    results = [self.evaluate(key, formulas_dict, df_mapped, frame) for key in level]
+                else:
+                    with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                        results = list(executor.map(
+                            lambda key: self.evaluate(key, formulas_dict, df_mapped, frame), level
+                        ))
+            # Assign the results to the DataFrame once the whole level has been evaluated
+            for key, result in zip(level, results):
+                df_mapped[key] = result
 
+        if list(df_mapped.columns) != column_order:
+            df_mapped = df_mapped[column_order]
+
+        return df_mapped
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import tempfile
+import pandas as pd
+from column_profiler import ColumnProfile
+from exporters import columnar_frame
+
+
+# Columns added to the stored output to key each row on its loan and raw content
+ROW_ID_COLUMN = '__row_id'
+ROW_HASH_COLUMN = '__row_hash'
+
+
+def row_hashes(df):
+    """
+    Hash the content of every row.
+
+    Parameters:
+    - df (DataFrame): The raw rows, before cleaning.
+
+    Returns:
+    - ndarray: One uint64 hash per row; equal rows hash equally whatever their position.
+    """
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def config_hash(standard_df, formulas_dict, conversion_rates, compactor=None):
+    """
+    Hash everything besides the raw rows that decides the output, so stored rows are
+    only reused while the standard file, the formulas, the rates and the dtype settings
+    are unchanged.
+
+    Parameters:
+    - standard_df (DataFrame): The standard data DataFrame.
+    - formulas_dict (dict): The converted formulas.
+    - conversion_rates (dict): Currency symbol to currency name mapping.
+    - compactor (DtypeCompactor): The compact dtype settings, None when dtypes are not compacted.
+
+    Returns:
+    - str: The sha256 hex digest.
+    """
+    config = {
+        'standard': standard_df.to_dict(orient='records') if standard_df is not None else None,
+        'formulas': formulas_dict,
+        'conversion_rates': conversion_rates,
+        'compactor': vars(compactor) if compactor is not None else None,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class IncrementalState:
+    def __init__(self, output, config, profile):
+        """
+        Initialize the IncrementalState class, the result of a lender's previous run.
+
+        Parameters:
+        - output (DataFrame): The mapped output, with the row id and row hash columns.
+        - config (str): The config_hash of the run.
+        - profile (ColumnProfile): Column decisions used to clean the tape.
+        """
+        self.output = output
+        self.config = config
+        self.profile = profile
+
+
+class IncrementalStore:
+    """
+    Keep the last mapped output of each portfolio on disk, keyed on loan id and raw row hash.
+
+    Every state key (the lender and the portfolio, e.g. 'verdam-verdam_mapped') has a
+    Parquet file with the output rows and a JSON file with the config hash and the
+    column profile. Both are written to uniquely named temporary files and then
+    replaced atomically, so an interrupted run leaves the previous state intact and
+    concurrent runs never write to the same temporary file.
+    """
+
+    def __init__(self, directory):
+        """
+        Initialize the IncrementalStore class.
+
+        Parameters:
+        - directory (str): Directory holding the state files.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def paths(self, key):
+        base = os.path.join(self.directory, key)
+        return f"{base}.parquet", f"{base}.json"
+
+    def temporary_path(self, path):
+        """
+        Create a uniquely named temporary file next to a state file.
+
+        Parameters:
+        - path (str): The state file it will replace.
+
+        Returns:
+        - str: The path of the empty temporary file.
+        """
+        fd, temporary = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix='.tmp', dir=self.directory)
+        os.close(fd)
+        return temporary
+
+    def load(self, key):
+        """
+        Load a portfolio's previous run.
+
+        Parameters:
+        - key (str): The state key, '<lender>-<portfolio>'.
+
+        Returns:
+        - IncrementalState: The previous run, or None when there is none.
+        """
+        output_path, meta_path = self.paths(key)
+        if not (os.path.exists(output_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        output = pd.read_parquet(output_path)
+        return IncrementalState(output, meta['config'], ColumnProfile(**meta['profile']))
+
+    def save(self, key, state):
+        """
+        Store a portfolio's run, replacing the previous one.
+
+        Parameters:
+        - key (str): The state key, '<lender>-<portfolio>'.
+        - state (IncrementalState): The run to store.
+        """
+        output_path, meta_path = self.paths(key)
+        output_temporary = self.temporary_path(output_path)
+        meta_temporary = self.temporary_path(meta_path)
+        try:
+            columnar_frame(state.output).to_parquet(output_temporary, index=False)
+            with open(meta_temporary, 'w', encoding='utf-8') as f:
+                json.dump({'config': state.config, 'profile': vars(state.profile)}, f, indent=2)
+            os.replace(output_temporary, output_path)
+            os.replace(meta_temporary, meta_path)
+        finally:
+            for temporary in (output_temporary, meta_temporary):
+                if os.path.exists(temporary):
+                    os.remove(temporary)
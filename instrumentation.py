@@ -0,0 +1,240 @@
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss():
+    """
+    Get the peak resident set size of the process so far.
+
+    Returns:
+        int: Peak RSS in bytes, or None when the platform does not report it.
+    """
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory = psutil.Process().memory_info()
+    return getattr(memory, 'peak_wset', memory.rss)
+
+
+class StageRecord:
+    def __init__(self, name, tape=None):
+        """
+        Initialize the StageRecord class, the measurements of one stage or calculated field.
+
+        Args:
+            name (str): The stage or calculated field name.
+            tape (str): Name of the raw file being processed.
+        """
+        self.name = name
+        self.tape = tape
+        self.wall_time = None
+        self.cpu_time = None
+        self.peak_memory = None
+        self.peak_rss = None
+        self.rows = None
+        self.columns = None
+        self.error = None
+
+    def set_frame(self, df):
+        """
+        Record the shape of the DataFrame a stage produced.
+
+        Args:
+            df (DataFrame): The stage output.
+        """
+        self.rows, self.columns = df.shape
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class Instrumentation:
+    """
+    Record wall time, CPU time, memory and DataFrame shapes for each pipeline
+    stage and each calculated field of a run.
+    """
+
+    def __init__(self, trace_memory=False):
+        """
+        Initialize the Instrumentation class.
+
+        Args:
+            trace_memory (bool): Measure each stage's peak Python allocations with
+                tracemalloc. This slows allocation-heavy stages down noticeably,
+                so it is off by default; peak RSS is recorded either way.
+        """
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.fields = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, tape=None):
+        """
+        Measure one pipeline stage.
+
+        Stages run one after the other, so CPU time is the process CPU time and
+        the tracemalloc peak is reset at the start of each stage.
+
+        Args:
+            name (str): The stage name.
+            tape (str): Name of the raw file being processed.
+
+        Yields:
+            StageRecord: The record, on which the stage can call set_frame.
+        """
+        record = StageRecord(name, tape)
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield record
+        except Exception as e:
+            record.error = str(e)
+            raise
+        finally:
+            record.wall_time = time.perf_counter() - start_wall
+            record.cpu_time = time.process_time() - start_cpu
+            if self.trace_memory:
+                record.peak_memory = tracemalloc.get_traced_memory()[1] - start_memory
+                if tracing:
+                    tracemalloc.stop()
+            record.peak_rss = peak_rss()
+            with self.lock:
+                self.stages.append(record)
+
+    @contextmanager
+    def field(self, name, tape=None):
+        """
+        Measure the evaluation of one calculated field.
+
+        Independent fields may run on several threads at once, so CPU time is
+        the evaluating thread's own and memory is only reported per stage.
+
+        Args:
+            name (str): The calculated field name.
+            tape (str): Name of the raw file being processed.
+
+        Yields:
+            StageRecord: The record for the field.
+        """
+        record = StageRecord(name, tape)
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield record
+        finally:
+            record.wall_time = time.perf_counter() - start_wall
+            record.cpu_time = time.thread_time() - start_cpu
+            with self.lock:
+                self.fields.append(record)
+
+    def merge(self, other):
+        """
+        Add the records of another Instrumentation, e.g. one returned by a worker process.
+
+        Args:
+            other (Instrumentation): The instrumentation to merge in.
+        """
+        with self.lock:
+            self.stages.extend(other.stages)
+            self.fields.extend(other.fields)
+
+    def clear(self):
+        with self.lock:
+            self.stages = []
+            self.fields = []
+
+    @staticmethod
+    def summarize(records):
+        """
+        Total the records of each name, so chunked and batch runs read as one line per stage.
+
+        Args:
+            records (list): StageRecord objects.
+
+        Returns:
+            list: One dictionary per name, in first-seen order.
+        """
+        summary = {}
+        for record in records:
+            entry = summary.get(record.name)
+            if entry is None:
+                entry = summary[record.name] = {
+                    'name': record.name, 'calls': 0, 'wall_time': 0.0, 'cpu_time': 0.0,
+                    'peak_memory': None, 'peak_rss': None, 'rows': 0, 'columns': None, 'errors': 0,
+                }
+            entry['calls'] += 1
+            entry['wall_time'] += record.wall_time or 0.0
+            entry['cpu_time'] += record.cpu_time or 0.0
+            for key in ('peak_memory', 'peak_rss'):
+                value = getattr(record, key)
+                if value is not None:
+                    entry[key] = max(entry[key] or 0, value)
+            entry['rows'] += record.rows or 0
+            if record.columns is not None:
+                entry['columns'] = record.columns
+            entry['errors'] += record.error is not None
+        return list(summary.values())
+
+    def report(self):
+        """
+        Build the run report.
+
+        Returns:
+            dict: Per-stage and per-field totals plus every individual record.
+        """
+        with self.lock:
+            stages = list(self.stages)
+            fields = list(self.fields)
+        return {
+            'wall_time': sum(record.wall_time for record in stages),
+            'peak_rss': peak_rss(),
+            'stages': self.summarize(stages),
+            'fields': self.summarize(fields),
+            'records': {
+                'stages': [record.to_dict() for record in stages],
+                'fields': [record.to_dict() for record in fields],
+            },
+        }
+
+    def write_report(self, path):
+        """
+        Write the run report as JSON.
+
+        Args:
+            path (str): Path of the JSON report.
+
+        Returns:
+            str: The report path.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    def __getstate__(self):
+        # Locks cannot be pickled; worker processes get their own
+        state = dict(self.__dict__)
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
@@ -0,0 +1,175 @@
+import json
+import os
+from functools import lru_cache
+
+
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lender_schemas.json')
+
+# Share of a lender's columns a header must contain to be matched to it
+MIN_CONFIDENCE = 0.6
+
+
+class LenderMatch:
+    def __init__(self, lender, confidence, matched_columns, columns=None):
+        """
+        Initialize the LenderMatch class.
+
+        Args:
+            lender (str): The registered lender name.
+            confidence (float): Share of the lender's columns found in the header.
+            matched_columns (int): Number of the lender's columns found in the header.
+            columns (frozenset): The header's own names of the matched columns.
+        """
+        self.lender = lender
+        self.confidence = confidence
+        self.matched_columns = matched_columns
+        self.columns = columns or frozenset()
+
+
+class LenderRegistry:
+    def __init__(self, schemas):
+        """
+        Initialize the LenderRegistry class.
+
+        Args:
+            schemas (dict): A dictionary mapping lender names to {"columns": [...], "id_column": ...} entries.
+        """
+        self.schemas = schemas
+        self.columns = {name: list(schema['columns']) for name, schema in schemas.items()}
+        # Column identifying a loan across monthly tapes, used for incremental processing;
+        # None for lenders whose tapes have no loan id, which are always processed in full
+        self.id_columns = {name: schema.get('id_column') for name, schema in schemas.items()}
+        self.column_sets = {name: frozenset(columns) for name, columns in self.columns.items()}
+        self.normalised_sets = {
+            name: frozenset(self.normalise(column) for column in columns) for name, columns in self.columns.items()
+        }
+        # Case-folded lender names, so file name lookups are a single dict access
+        self.index = {name.casefold(): name for name in schemas}
+        # Exact header fingerprints; lenders sharing a schema resolve to the first registered
+        self.fingerprints = {}
+        for name, column_set in self.column_sets.items():
+            self.fingerprints.setdefault(column_set, name)
+        # Inverted index from normalised column name to the lenders using it
+        self.inverted_index = {}
+        for name, column_set in self.column_sets.items():
+            for column in column_set:
+                self.inverted_index.setdefault(self.normalise(column), []).append(name)
+        self.order = {name: position for position, name in enumerate(schemas)}
+
+    @staticmethod
+    def normalise(column):
+        return column.strip().casefold()
+
+    @classmethod
+    def from_file(cls, path=REGISTRY_PATH):
+        """
+        Load the registry from a JSON file.
+
+        Args:
+            path (str): Path of the JSON registry.
+
+        Returns:
+            LenderRegistry: The loaded registry.
+        """
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def lookup(self, lender):
+        """
+        Find a lender by name, ignoring case.
+
+        Args:
+            lender (str): The lender name.
+
+        Returns:
+            str: The registered lender name, or None.
+        """
+        return self.index.get(lender.casefold())
+
+    def lender_from_file_name(self, file_name):
+        """
+        Find the lender from the '<lender>_...' file name convention.
+
+        Args:
+            file_name (str): Name of the raw file.
+
+        Returns:
+            str: The registered lender name, or None.
+        """
+        return self.lookup(file_name[:file_name.find("_")])
+
+    def header_columns(self, lender, header):
+        """
+        Find a lender's columns in a raw header, comparing names the way match_header does.
+
+        Args:
+            lender (str): The registered lender name.
+            header (list): The raw column names.
+
+        Returns:
+            frozenset: The header's own names of the lender's columns, so they can be
+            selected from the raw file even when their case or spacing differs.
+        """
+        normalised = self.normalised_sets[lender]
+        return frozenset(column for column in header if self.normalise(column) in normalised)
+
+    def match_header(self, header):
+        """
+        Score a raw header against every registered lender schema.
+
+        Each header column is looked up in the inverted index, so the cost grows
+        with the header width rather than with lenders x columns. The confidence
+        is the share of the lender's columns present in the header; ties go to
+        the lender with more matched columns, then to the first registered.
+
+        Args:
+            header (list): The raw column names.
+
+        Returns:
+            LenderMatch: The best match, or None when no column is known.
+        """
+        header_set = frozenset(column.strip() for column in header)
+        lender = self.fingerprints.get(header_set)
+        if lender is not None:
+            return LenderMatch(lender, 1.0, len(header_set), header_set)
+
+        hits = {}
+        for column in {self.normalise(column) for column in header_set}:
+            for name in self.inverted_index.get(column, ()):
+                hits[name] = hits.get(name, 0) + 1
+        if not hits:
+            return None
+
+        best = max(hits, key=lambda name: (hits[name] / len(self.column_sets[name]), hits[name], -self.order[name]))
+        return LenderMatch(best, hits[best] / len(self.column_sets[best]), hits[best],
+                           self.header_columns(best, header_set))
+
+    def lender_from_header(self, header, min_confidence=MIN_CONFIDENCE):
+        """
+        Detect the lender from the raw file's header.
+
+        Args:
+            header (list): The raw column names.
+            min_confidence (float): Lowest confidence accepted as a match.
+
+        Returns:
+            str: The registered lender name, or None.
+        """
+        match = self.match_header(header)
+        if match is None or match.confidence < min_confidence:
+            return None
+        return match.lender
+
+
+@lru_cache(maxsize=None)
+def get_registry(path=REGISTRY_PATH):
+    """
+    Load the lender registry once per process.
+
+    Args:
+        path (str): Path of the JSON registry.
+
+    Returns:
+        LenderRegistry: The cached registry.
+    """
+    return LenderRegistry.from_file(path)
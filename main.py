@@ -1,16 +1,105 @@
 import streamlit as st
 import pandas as pd
-from flter_columns import ColumnExtractor  # Assuming you have this function
-from cleanings import DataCleaner  # Assuming you have this class
-from mapping import DataFrameColumnRenamer  # Assuming you have this class
-from hardcoded_fields import HardcodeColumns
-from calculations import FormulaConverter
-import os
+import hashlib
+import io
+from pipeline import DataPipeline
+from flter_columns import ColumnExtractor
+from exporters import DataFrameExporter, EXPORT_FORMATS
+from instrumentation import Instrumentation
+from formula_sandbox import FormulaSandbox
+import json
 
 
 import warnings
 warnings.filterwarnings('ignore')
 
+
+# Cached steps are keyed on the sha256 of the uploaded bytes; arguments starting
+# with an underscore are not hashed by st.cache_data, so each rerun only hashes a digest.
+
+def content_hash(uploaded_file):
+    """
+    Hash an uploaded file's content once per upload, remembering it in session_state.
+
+    Parameters:
+    - uploaded_file (UploadedFile): The uploaded file.
+
+    Returns:
+    - str: The sha256 hex digest of the file content.
+    """
+    hashes = st.session_state.setdefault('content_hashes', {})
+    if uploaded_file.file_id not in hashes:
+        hashes[uploaded_file.file_id] = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+    return hashes[uploaded_file.file_id]
+
+
+@st.cache_data(show_spinner="Reading raw file...")
+def read_raw(digest, file_name, _data):
+    """
+    Parse the lender's columns of a raw upload.
+
+    Returns:
+    - tuple: The raw DataFrame and the Instrumentation holding its read stage.
+    """
+    instrumentation = Instrumentation()
+    with instrumentation.stage('read', file_name) as record:
+        raw_df = ColumnExtractor.read_useful_columns(io.BytesIO(_data), file_name)
+        record.set_frame(raw_df)
+    return raw_df, instrumentation
+
+
+@st.cache_data(show_spinner=False)
+def read_upload(digest, _data):
+    """Parse a standard or calculations upload."""
+    return pd.read_csv(io.BytesIO(_data))
+
+
+@st.cache_data(show_spinner="Converting formulas...")
+def convert_formulas(digest, _calculations_df):
+    """
+    Convert the calculations once per calculations file, so reruns never call the LLM again.
+
+    Returns:
+    - tuple: The converted formulas and the Instrumentation holding the conversion stage.
+    """
+    instrumentation = Instrumentation()
+    pipeline = DataPipeline(None, _calculations_df.copy(), instrumentation=instrumentation)
+    return pipeline.convert_formulas(), instrumentation
+
+
+@st.cache_resource
+def formula_sandbox():
+    """
+    Share one formula sandbox between every session of the server, so a formula that
+    hangs or allocates too much only fails its own field and the processes are bounded server-wide.
+    """
+    return FormulaSandbox(timeout=60, memory_limit=2048)
+
+
+@st.cache_data(show_spinner="Processing...")
+def run_pipeline(key, file_name, trace_memory, _raw_df, _standard_df, _formulas_dict, _instrumentation):
+    """
+    Run the extract, clean, calculate and rename stages once per combination of inputs.
+
+    Returns:
+    - tuple: The DataFrame after each stage, keyed on the stage name, and the run report.
+    """
+    instrumentation = Instrumentation(trace_memory=trace_memory)
+    instrumentation.merge(_instrumentation)
+    stages = {}
+    pipeline = DataPipeline(_standard_df, None, formulas_dict=_formulas_dict, instrumentation=instrumentation,
+                            sandbox=formula_sandbox())
+    # Later stages modify their input in place, so each stage's output is copied as it is produced
+    pipeline.process(_raw_df, file_name, callback=lambda stage, df: stages.__setitem__(stage, df.copy()))
+    return stages, instrumentation.report()
+
+
+@st.cache_data(show_spinner=False)
+def export_frame(key, output_format, _df_mapped):
+    """Serialize the mapped DataFrame for the download button, once per format."""
+    return DataFrameExporter(output_format).to_bytes(_df_mapped)
+
+
 class FileUploaderApp:
     def __init__(self):
         self.upload_raw_file = None
@@ -36,102 +125,76 @@ class FileUploaderApp:
         st.title("CSV File Uploader and Processor")
 
         self.file_upload()
+        output_format = st.selectbox("Output format", list(EXPORT_FORMATS))
+        trace_memory = st.checkbox("Trace memory per stage (slower)")
         submitted = st.button("Submit")
 
-        if submitted:
-            raw_df = None
-            standard_df = None
-            calculations_df = None
-
-            # Read uploaded raw file if available
-            if self.upload_raw_file:
-                raw_df = pd.read_csv(self.upload_raw_file)
-                st.write("Raw Data:")
-                st.write(raw_df)
-                st.write(len(raw_df.columns))
-
-            # Read uploaded standard file if available
-            if self.upload_standard_file:
-                standard_df = pd.read_csv(self.upload_standard_file)
-                st.write("Standard Data:")
-                st.write(standard_df)
-                st.write(len(standard_df.columns))
-
-            # Read uploaded calculations file if available
-            if self.upload_calculations_file:
-                calculations_df = pd.read_csv(self.upload_calculations_file)
-                st.write("Calculations Data:")
-                st.write(calculations_df)
-
-            # Initialize the ColumnExtractor class to get useful columns
-            extractor = ColumnExtractor(raw_df, standard_df, calculations_df)
-            useful_columns_data, filtered_dict = extractor.get_useful_columns(self.upload_raw_file.name)
+        uploads = (self.upload_raw_file, self.upload_standard_file, self.upload_calculations_file)
+        if not all(uploads):
+            if submitted:
+                st.warning("Upload the raw, standard and calculations files first.")
+            return
+        digests = [content_hash(upload) for upload in uploads]
+        key = hashlib.sha256('|'.join(digests + [self.upload_raw_file.name, str(trace_memory)]).encode()).hexdigest()
 
-            st.write("Useful Columns:")
-            st.write(useful_columns_data)
-            st.write(len(useful_columns_data.columns))
-
-
-
-
-            # Initialize the DataCleaner class to clean data
-            cleaner = DataCleaner(useful_columns_data)
-
-            # Define conversion rates for currencies (example)
-            conversion_rates = {'$': 'USD', '€': 'EUR', '£': 'GBP'}
-
-            # Clean data using the defined conversion rates
-            cleaned_columns_data = cleaner.clean_data(conversion_rates)
-
-            st.write("Cleaned Columns:")
-            st.write(cleaned_columns_data)
-            st.write(len(cleaned_columns_data.columns))
-
-            # cleaned_columns_data.to_csv('mapped_data.csv', index=False)
-            # with open('cleaned_data.csv', 'rb') as f:
-            #     data = f.read()
-
-            # if st.button('Download CSV'):
-            #     csv_data = data
-            #     st.download_button(label='Download CSV', data=csv_data, key='download_button')
-
-
-
-
-            # api_key = os.getenv('OPENAI_API_KEY')
-            converter = FormulaConverter()
-            formulas_dict = converter.convert(calculations_df)
-
-            handler = HardcodeColumns()
-            calculated_df = handler.process_values(filtered_dict, cleaned_columns_data, formulas_dict)
-
-            st.write("Final Dataframe:")
-            st.write(calculated_df)
-            st.write(len(calculated_df.columns))
-
-            # calculated_df.to_csv('calculated_data.csv', index=False)
-            # with open('calculated_data.csv', 'rb') as f:
-            #     data = f.read()
-
-            # if st.button('Download CSV'):
-            #     csv_data = data
-            #     st.download_button(label='Download CSV', data=csv_data, key='download_button')
-
-            # Initialize the DataFrameColumnRenamer class to rename columns
-            mapper = DataFrameColumnRenamer(calculated_df, standard_df)
-            df_mapped = mapper.rename_columns()
-
-            st.write("Mapped Dataframe:")
-            st.write(df_mapped)
-            st.write(len(df_mapped.columns))
-
-            df_mapped.to_csv('calculated_data.csv', index=False)
-            with open('calculated_data.csv', 'rb') as f:
-                data = f.read()
-
-            if st.button('Download CSV'):
-                csv_data = data
-                st.download_button(label='Download CSV', data=csv_data, key='download_button')
+        # Results stay on screen across reruns (format changes, downloads) until the inputs change
+        if submitted:
+            st.session_state['submitted_key'] = key
+        if st.session_state.get('submitted_key') != key:
+            return
+
+        raw_digest, standard_digest, calculations_digest = digests
+        file_name = self.upload_raw_file.name
+        # Only the lender's columns are parsed
+        raw_df, read_instrumentation = read_raw(raw_digest, file_name, self.upload_raw_file.getvalue())
+        standard_df = read_upload(standard_digest, self.upload_standard_file.getvalue())
+        calculations_df = read_upload(calculations_digest, self.upload_calculations_file.getvalue())
+
+        st.write("Raw Data:")
+        st.write(raw_df)
+        st.write(len(raw_df.columns))
+        st.write("Standard Data:")
+        st.write(standard_df)
+        st.write(len(standard_df.columns))
+        st.write("Calculations Data:")
+        st.write(calculations_df)
+
+        formulas_dict, convert_instrumentation = convert_formulas(calculations_digest, calculations_df)
+        instrumentation = Instrumentation()
+        instrumentation.merge(read_instrumentation)
+        instrumentation.merge(convert_instrumentation)
+        stages, report = run_pipeline(key, file_name, trace_memory, raw_df, standard_df, formulas_dict,
+                                      instrumentation)
+
+        # Show each intermediate result of the extract, clean, calculate and rename stages
+        for stage, df in stages.items():
+            st.write(f"{stage}:")
+            st.write(df)
+            st.write(len(df.columns))
+
+        # Serialized in memory and handed straight to the download button, nothing is written to disk
+        exporter = DataFrameExporter(output_format)
+        st.download_button(label=f'Download {output_format.upper()}',
+                           data=export_frame(key, output_format, stages['Mapped Dataframe']),
+                           file_name=f'calculated_data{exporter.extension}', mime=exporter.mime_type,
+                           key='download_button')
+
+        self.show_report(report)
+
+    def show_report(self, report):
+        """
+        Display the time, CPU, memory and shape of each stage and calculated field.
+        No return value.
+        """
+        st.subheader("Run Summary")
+        st.write(f"Total time: {report['wall_time']:.2f}s")
+        columns = ['name', 'wall_time', 'cpu_time', 'peak_memory', 'peak_rss', 'rows', 'columns']
+        st.dataframe(pd.DataFrame(report['stages'])[columns])
+        if report['fields']:
+            st.write("Calculated fields:")
+            st.dataframe(pd.DataFrame(report['fields'])[['name', 'wall_time', 'cpu_time', 'rows', 'errors']])
+        st.download_button(label='Download run report', data=json.dumps(report, indent=2),
+                           file_name='run_report.json', mime='application/json', key='report_button')
 
         
 
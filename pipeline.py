@@ -0,0 +1,368 @@
+import logging
+import os
+from contextlib import nullcontext
+import numpy as np
+import pandas as pd
+from flter_columns import ColumnExtractor
+from cleanings import DataCleaner
+from mapping import DataFrameColumnRenamer
+from hardcoded_fields import HardcodeColumns
+from calculations import FormulaConverter
+from constant_columns import ConstantColumns
+from exporters import DataFrameExporter, ChunkWriter, format_from_path
+from instrumentation import StageRecord
+from incremental import IncrementalState, row_hashes, config_hash, ROW_ID_COLUMN, ROW_HASH_COLUMN
+from lender_registry import get_registry
+from pipeline_context import PipelineContext
+
+
+# Conversion rates for currency symbols found in the raw tapes
+CONVERSION_RATES = {'$': 'USD', '€': 'EUR', '£': 'GBP'}
+
+
+class DataPipeline:
+    def __init__(self, standard_df, calculations_df, conversion_rates=None, converter=None, formulas_dict=None,
+                 profiler=None, chunksize=None, engine=None, exporter=None,
+                 instrumentation=None, state_store=None, compactor=None, sandbox=None):
+        """
+        Initialize the DataPipeline class.
+
+        Args:
+            standard_df (DataFrame): The standard data DataFrame.
+            calculations_df (DataFrame): The calculations data DataFrame.
+            conversion_rates (dict): A dictionary mapping currency symbols to currency names.
+            converter (FormulaConverter): Converter used for the calculated fields.
+            formulas_dict (dict): Already converted formulas, skips the conversion step.
+            profiler (ColumnProfiler): Profiler DataCleaner uses to classify the columns.
+            chunksize (int): Rows per chunk; when set, files are streamed instead of loaded whole.
+            engine (str): CSV parser engine, 'pyarrow' for Arrow-backed ingestion.
+            exporter (DataFrameExporter): Output writer; the format follows the output extension when None.
+            instrumentation (Instrumentation): Records time, memory and shape of every stage when given.
+            state_store (IncrementalStore): Previous runs per lender; when given, only new or changed
+                loans are recomputed.
+            compactor (DtypeCompactor): Converts cleaned columns to compact dtypes before the
+                calculated fields when given.
+            sandbox (FormulaSandbox): Runs every calculated field in a separate process with
+                time and memory limits when given.
+        """
+        self.standard_df = standard_df
+        self.calculations_df = calculations_df
+        self.conversion_rates = conversion_rates or CONVERSION_RATES
+        self.converter = converter
+        self.formulas_dict = formulas_dict
+        self.profiler = profiler
+        self.chunksize = chunksize
+        self.engine = engine
+        self.exporter = exporter
+        self.instrumentation = instrumentation
+        self.state_store = state_store
+        self.compactor = compactor
+        self.sandbox = sandbox
+
+    def convert_formulas(self):
+        """
+        Convert the calculations file into python code, once per pipeline.
+
+        Returns:
+            dict: A dictionary mapping field names to converted python code.
+        """
+        if self.formulas_dict is None:
+            if self.calculations_df is None:
+                self.formulas_dict = {}
+            else:
+                converter = self.converter or FormulaConverter()
+                with self.stage('convert_formulas') as record:
+                    self.formulas_dict = converter.convert(self.calculations_df)
+                    record.rows, record.columns = len(self.calculations_df), len(self.formulas_dict)
+        return self.formulas_dict
+
+    def stage(self, name, file_name=None):
+        """
+        Measure a stage with the pipeline's instrumentation, if any.
+
+        Args:
+            name (str): The stage name.
+            file_name (str): Name of the raw file being processed.
+
+        Returns:
+            context manager: Yields the StageRecord of the stage.
+        """
+        if self.instrumentation is None:
+            return nullcontext(StageRecord(name, file_name))
+        return self.instrumentation.stage(name, file_name)
+
+    def read_options(self):
+        """
+        Get the pd.read_csv options for the configured engine.
+
+        Returns:
+            dict: Keyword arguments for ColumnExtractor.read_useful_columns.
+        """
+        if self.engine:
+            return {'engine': self.engine}
+        return {}
+
+    def exporter_for(self, output_path):
+        """
+        Get the exporter for an output file.
+
+        Args:
+            output_path (str): Path of the output file.
+
+        Returns:
+            DataFrameExporter: The configured exporter, or one for the file extension (CSV by default).
+        """
+        return self.exporter or DataFrameExporter(format_from_path(output_path))
+
+    def process(self, raw_df, file_name, callback=None):
+        """
+        Run the extract, clean, calculate and rename stages on a raw tape.
+
+        raw_df is left unchanged: the extract stage copies the lender's columns, and
+        the later stages work on that copy.
+
+        Args:
+            raw_df (DataFrame): The raw data DataFrame.
+            file_name (str): Name of the raw file, used to detect the lender.
+            callback (callable): Optional callback(stage, df) called after each stage. The stages
+                share one working frame, so a callback keeping a stage's result must copy it.
+
+        Returns:
+            DataFrame: The mapped DataFrame, with the hardcoded fields as categorical columns.
+        """
+        df_mapped, _, constants = self.run_stages(raw_df, file_name, callback=callback)
+        return constants.expand(df_mapped)
+
+    def run_stages(self, raw_df, file_name, profile=None, callback=None, copy=True):
+        """
+        Run the extract, clean, calculate and rename stages on a raw tape or a chunk of one.
+
+        Args:
+            raw_df (DataFrame): The raw data DataFrame.
+            file_name (str): Name of the raw file, used to detect the lender.
+            profile (ColumnProfile): Column decisions to reuse, detected from raw_df when None.
+            callback (callable): Optional callback(stage, df) called after each stage.
+            copy (bool): Leave raw_df untouched; False when the pipeline read raw_df itself,
+                so the stages work on it in place.
+
+        Returns:
+            tuple: The mapped DataFrame without its hardcoded fields, the ColumnProfile
+            used to clean it, and the ConstantColumns holding the hardcoded fields.
+        """
+        with self.stage('extract', file_name) as record:
+            extractor = ColumnExtractor(raw_df, self.standard_df, self.calculations_df)
+            useful_columns_data, filtered_dict = extractor.get_useful_columns(file_name, copy=copy)
+            record.set_frame(useful_columns_data)
+        if callback:
+            callback('Useful Columns', useful_columns_data)
+
+        return self.transform(useful_columns_data, filtered_dict, file_name, profile=profile, callback=callback)
+
+    def transform(self, useful_columns_data, filtered_dict, file_name, profile=None, callback=None):
+        """
+        Run the clean, calculate and rename stages on the extracted columns.
+
+        Args:
+            useful_columns_data (DataFrame): The lender's columns of the raw tape.
+            filtered_dict (dict): The standard fields not taken from the raw tape.
+            file_name (str): Name of the raw file.
+            profile (ColumnProfile): Column decisions to reuse, detected from the data when None.
+            callback (callable): Optional callback(stage, df) called after each stage.
+
+        The hardcoded and null fields are kept out of the working frame as
+        ConstantColumns, and only expanded into it when the output is written.
+
+        Returns:
+            tuple: The mapped DataFrame without its hardcoded fields, the ColumnProfile
+            used to clean it, and the ConstantColumns holding the hardcoded fields.
+        """
+        # One working frame is passed through the stages, none of them copies it
+        context = PipelineContext(useful_columns_data, file_name)
+        with self.stage('clean', file_name) as record:
+            cleaner = DataCleaner(context.borrow('clean'), profiler=self.profiler, profile=profile)
+            cleaned_columns_data = context.release('clean', cleaner.clean_data(self.conversion_rates, copy=False))
+            record.set_frame(cleaned_columns_data)
+        if callback:
+            callback('Cleaned Columns', cleaned_columns_data)
+
+        if self.compactor is not None:
+            with self.stage('compact', file_name) as record:
+                cleaned_columns_data = context.release(
+                    'compact', self.compactor.compact(context.borrow('compact'), cleaner.profile_columns())
+                )
+                record.set_frame(cleaned_columns_data)
+
+        formulas_dict = self.convert_formulas()
+        constants = ConstantColumns()
+        with self.stage('calculate', file_name) as record:
+            handler = HardcodeColumns(instrumentation=self.instrumentation, tape=file_name, sandbox=self.sandbox)
+            calculated_df = context.release(
+                'calculate',
+                handler.process_values(filtered_dict, context.borrow('calculate'), formulas_dict, constants=constants)
+            )
+            record.set_frame(calculated_df)
+        if callback:
+            callback('Final Dataframe', constants.expand(calculated_df))
+
+        with self.stage('rename', file_name) as record:
+            mapper = DataFrameColumnRenamer(context.borrow('rename'), self.standard_df)
+            df_mapped = context.release('rename', mapper.rename_columns())
+            constants.rename(mapper.exchange_keys_values())
+            record.set_frame(df_mapped)
+        if callback:
+            callback('Mapped Dataframe', constants.expand(df_mapped))
+
+        return df_mapped, cleaner.profile_columns(), constants
+
+    def process_incremental(self, raw_df, file_name, callback=None, state_key=None, copy=True):
+        """
+        Process a raw tape, recomputing only the loans that are new or changed since
+        the previous run of the same portfolio and reusing the stored output for the rest.
+
+        Rows are keyed on the lender's id column from the registry and compared by
+        a hash of their raw content. The previous run is only reused while the
+        standard file, formulas, conversion rates and dtype settings are unchanged, and its column
+        profile (including the date formats) is applied to the changed rows, so the
+        merged output matches a full run. As with streaming, calculated fields must
+        not depend on other rows. Tapes of an unknown lender or a lender without an
+        id column, or whose ids are missing or repeated, are processed in full.
+
+        The state is stored per lender and state key, so several tapes of one lender
+        (e.g. in the same batch) each keep their own previous run.
+
+        Args:
+            raw_df (DataFrame): The raw data DataFrame.
+            file_name (str): Name of the raw file, used to detect the lender.
+            callback (callable): Optional callback(stage, df) called after each stage.
+            state_key (str): Name of the portfolio the tape belongs to, stable from one month
+                to the next; defaults to the file name without its extension.
+            copy (bool): Leave raw_df untouched; False when the pipeline read raw_df itself.
+
+        Returns:
+            DataFrame: The mapped DataFrame.
+        """
+        with self.stage('extract', file_name) as record:
+            extractor = ColumnExtractor(raw_df, self.standard_df, self.calculations_df)
+            useful_columns_data, filtered_dict = extractor.get_useful_columns(file_name, copy=copy)
+            record.set_frame(useful_columns_data)
+        if callback:
+            callback('Useful Columns', useful_columns_data)
+
+        lender = ColumnExtractor.match_lender(file_name, list(useful_columns_data.columns))
+        id_column = get_registry().id_columns.get(lender) if lender else None
+        ids = useful_columns_data[id_column] if id_column in useful_columns_data.columns else None
+        if ids is None or ids.isna().any() or ids.duplicated().any():
+            logging.warning(f"No unique loan id found in {file_name}, processing every row")
+            df_mapped, _, constants = self.transform(useful_columns_data, filtered_dict, file_name, callback=callback)
+            return constants.expand(df_mapped)
+
+        with self.stage('hash', file_name) as record:
+            hashes = row_hashes(useful_columns_data)
+            config = config_hash(self.standard_df, self.convert_formulas(), self.conversion_rates, self.compactor)
+            key = f"{lender}-{state_key or os.path.splitext(file_name)[0]}"
+            state = self.state_store.load(key)
+            if state is not None and state.config != config:
+                logging.info(f"Standard file, formulas, rates or dtype settings changed for {lender}, processing every row")
+                state = None
+            changed = np.ones(len(ids), dtype=bool)
+            if state is not None:
+                # Position of each loan in the stored output, -1 for new loans
+                positions = pd.Index(state.output[ROW_ID_COLUMN]).get_indexer(ids.to_numpy())
+                stored_hashes = state.output[ROW_HASH_COLUMN].to_numpy()
+                changed = (positions == -1) | (stored_hashes[positions] != hashes)
+            record.rows = int(changed.sum())
+
+        profile = state.profile if state is not None else None
+        df_mapped = None
+        if changed.any():
+            changed_rows = useful_columns_data if changed.all() else useful_columns_data[changed]
+            df_mapped, profile, constants = self.transform(changed_rows, filtered_dict, file_name,
+                                                           profile=profile, callback=callback)
+            # The stored output keeps every column
+            df_mapped = constants.expand(df_mapped)
+
+        with self.stage('merge', file_name) as record:
+            if not changed.all():
+                # Stored rows of unchanged loans, placed at their position in this tape
+                unchanged = state.output.iloc[positions[~changed]].drop(columns=[ROW_ID_COLUMN, ROW_HASH_COLUMN])
+                unchanged.index = useful_columns_data.index[~changed]
+                columns = list(df_mapped.columns) if df_mapped is not None else list(unchanged.columns)
+                df_mapped = pd.concat([unchanged, df_mapped]).sort_index()[columns]
+            record.set_frame(df_mapped)
+
+            stored = df_mapped.assign(**{ROW_ID_COLUMN: ids.to_numpy(), ROW_HASH_COLUMN: hashes})
+            self.state_store.save(key, IncrementalState(stored, config, profile))
+
+        logging.info(f"{file_name}: recomputed {int(changed.sum())} of {len(ids)} rows")
+        return df_mapped
+
+    def process_file(self, raw_path, output_path):
+        """
+        Read a raw tape from disk, process it and write the mapped output as CSV, Parquet or Feather.
+
+        Args:
+            raw_path (str): Path of the raw CSV file.
+            output_path (str): Path of the output file.
+
+        Returns:
+            str: The output path.
+        """
+        if self.chunksize and self.state_store is None:
+            return self.stream_file(raw_path, output_path)
+        if self.chunksize:
+            logging.warning("Incremental processing reads tapes whole, ignoring the chunk size")
+
+        file_name = os.path.basename(raw_path)
+        with self.stage('read', file_name) as record:
+            raw_df = ColumnExtractor.read_useful_columns(raw_path, file_name, **self.read_options())
+            record.set_frame(raw_df)
+        constants = ConstantColumns()
+        if self.state_store is not None:
+            # Keyed on the output name, which stays the same from month to month when
+            # new tapes are written over the previous output
+            state_key = os.path.splitext(os.path.basename(output_path))[0]
+            df_mapped = self.process_incremental(raw_df, file_name, state_key=state_key, copy=False)
+        else:
+            df_mapped, _, constants = self.run_stages(raw_df, file_name, copy=False)
+        with self.stage('write', file_name) as record:
+            # Hardcoded fields are only broadcast to every row here
+            df_mapped = constants.expand(df_mapped)
+            self.exporter_for(output_path).write(df_mapped, output_path)
+            record.set_frame(df_mapped)
+        return output_path
+
+    def stream_file(self, raw_path, output_path):
+        """
+        Process a raw tape in row chunks, appending each mapped chunk to the output file.
+
+        Column detection (currency, percentage and date columns and date formats)
+        is decided on the first chunk and reused for the rest, so every chunk is
+        cleaned the same way and written with the same columns. Only one chunk is
+        held in memory at a time, so calculated fields must not depend on other rows.
+
+        Args:
+            raw_path (str): Path of the raw CSV file.
+            output_path (str): Path of the output file.
+
+        Returns:
+            str: The output path.
+        """
+        file_name = os.path.basename(raw_path)
+        if self.engine == 'pyarrow':
+            logging.warning("The pyarrow engine cannot read in chunks, streaming with the default engine")
+        profile = None
+        with ChunkWriter(self.exporter_for(output_path), output_path) as writer:
+            chunks = iter(ColumnExtractor.read_useful_columns(raw_path, file_name, chunksize=self.chunksize))
+            while True:
+                with self.stage('read', file_name) as record:
+                    raw_chunk = next(chunks, None)
+                    if raw_chunk is not None:
+                        record.set_frame(raw_chunk)
+                if raw_chunk is None:
+                    break
+                df_mapped, profile, constants = self.run_stages(raw_chunk, file_name, profile=profile, copy=False)
+                with self.stage('write', file_name) as record:
+                    df_mapped = constants.expand(df_mapped)
+                    writer.write(df_mapped)
+                    record.set_frame(df_mapped)
+        return output_path
@@ -0,0 +1,68 @@
+class PipelineContext:
+    """
+    Own the working DataFrame of one pipeline run.
+
+    The extract stage creates the frame, and every later stage works on that same
+    frame instead of taking a copy. Only the stages in MUTATING_STAGES may change
+    it in place, one at a time and in pipeline order: a stage borrows the frame,
+    changes it, and releases the frame it produced, which becomes the working
+    frame for the next stage.
+
+    Because the frame is shared, anything that keeps a reference to it between
+    stages (e.g. a callback displaying intermediate results) sees the later
+    changes and must copy it to keep a snapshot.
+    """
+
+    MUTATING_STAGES = ('clean', 'compact', 'calculate', 'rename')
+
+    def __init__(self, frame, file_name=None):
+        """
+        Initialize the PipelineContext class.
+
+        Args:
+            frame (DataFrame): The extracted columns of the raw tape.
+            file_name (str): Name of the raw file being processed.
+        """
+        self.frame = frame
+        self.file_name = file_name
+        self.borrower = None
+        self.completed = []
+
+    def borrow(self, stage):
+        """
+        Hand the working frame to a stage that changes it in place.
+
+        Args:
+            stage (str): The stage name, one of MUTATING_STAGES.
+
+        Returns:
+            DataFrame: The working frame.
+        """
+        if stage not in self.MUTATING_STAGES:
+            raise ValueError(f"Stage '{stage}' may not modify the working frame")
+        if self.borrower is not None:
+            raise RuntimeError(f"Stage '{stage}' cannot borrow the frame while '{self.borrower}' holds it")
+        if stage in self.completed or any(
+            self.MUTATING_STAGES.index(done) > self.MUTATING_STAGES.index(stage) for done in self.completed
+        ):
+            raise RuntimeError(f"Stage '{stage}' runs out of order after {self.completed}")
+        self.borrower = stage
+        return self.frame
+
+    def release(self, stage, frame):
+        """
+        Take back the frame a stage produced; it becomes the working frame.
+
+        Args:
+            stage (str): The stage returning the frame.
+            frame (DataFrame): The stage output, usually the borrowed frame itself.
+
+        Returns:
+            DataFrame: The new working frame.
+        """
+        if stage != self.borrower:
+            raise RuntimeError(f"Stage '{stage}' releases a frame it did not borrow")
+        self.frame = frame
+        self.borrower = None
+        self.completed.append(stage)
+        return frame
@@ -0,0 +1,49 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def standard_df():
+    return pd.DataFrame([{
+        'Unique ID': 'UniqueLoanID', 'Loan Status': 'LoanStatus', 'Start Date': 'LoanStartDate',
+        'Original Principal Balance': 'AmountApproved', 'APR': 'APRApproved', 'OPB': 'OutstandingBalance',
+        'Employer': 'Employer', 'MaxArrears': 'MaxArrears', 'Country': 'UK', 'Currency': 'GBP', 'LTV': '-',
+        'Eligibility Flag': 'Calculation', 'Double Arrears': 'Calculation',
+    }])
+
+
+@pytest.fixture
+def formulas_dict():
+    return {
+        'Eligibility Flag': "result = np.where(pd.to_numeric(df_mapped['MaxArrears'], errors='coerce') > 6, "
+                            "'Ineligible', 'Eligible')",
+        'Double Arrears': "result = pd.to_numeric(df_mapped['MaxArrears'], errors='coerce') * 2",
+    }
+
+
+@pytest.fixture
+def verdam_tape():
+    """Build a small raw verdam tape; the header has the stray spaces real tapes have."""
+
+    def build(rows=40, seed=0):
+        rng = np.random.default_rng(seed)
+        return pd.DataFrame({
+            ' UniqueLoanID ': np.arange(rows),
+            'PurposeOfLoan': rng.choice(['Car purchase', 'Debt Consolidation'], rows),
+            'Employer': rng.choice(['NHS', 'Police Mutual'], rows),
+            'LoanStatus': rng.choice(['Active', 'Repaid'], rows),
+            'LoanStartDate': rng.choice(['04/04/2019', '05/01/2020'], rows),
+            'AmountApproved': [f"£{value:,.2f}" for value in rng.uniform(1000, 20000, rows)],
+            'APRApproved': [f"{value:.2f}%" for value in rng.uniform(1, 20, rows)],
+            'OutstandingBalance': rng.uniform(0, 5000, rows).round(2),
+            'MaxArrears': rng.integers(0, 10, rows),
+            'Extra': 'x',
+        })
+
+    return build
@@ -0,0 +1,18 @@
+import pandas as pd
+from column_profiler import ColumnProfile
+from dtype_compactor import DtypeCompactor
+
+
+def test_thousands_separators_become_floats():
+    df = pd.DataFrame({
+        'Amount': ['15,000', '2,752.50', None],
+        'Reference': ['001', '002', '003'],
+        'Ratio': ['1,2', '3', '4'],
+    })
+    profile = ColumnProfile([], [], [])
+    compacted = DtypeCompactor().compact(df, profile)
+    assert profile.dtypes['Amount'] == 'float64'
+    assert compacted['Amount'].tolist()[:2] == [15000.0, 2752.5]
+    # Leading zeros and values that are not thousands separators are kept as text
+    assert compacted['Reference'].tolist() == ['001', '002', '003']
+    assert 'Ratio' not in profile.dtypes
@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+import pytest
+from exporters import ChunkWriter, DataFrameExporter
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_chunk_writer_types_columns_blank_in_the_first_chunk(tmp_path, fmt):
+    path = str(tmp_path / f'out.{fmt}')
+    chunks = [
+        pd.DataFrame({'Loan ID': np.array([1, 2], dtype=np.int8), 'Employer': [np.nan, np.nan]}),
+        pd.DataFrame({'Loan ID': np.array([3, 4], dtype=np.int16), 'Employer': ['NHS', np.nan]}),
+    ]
+
+    with ChunkWriter(DataFrameExporter(fmt), path) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    written = pd.read_parquet(path) if fmt == 'parquet' else pd.read_feather(path)
+    assert written['Loan ID'].tolist() == [1, 2, 3, 4]
+    assert written['Employer'].isna().tolist() == [True, True, False, True]
+    assert written['Employer'][2] == 'NHS'
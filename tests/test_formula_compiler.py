@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+from formula_compiler import FormulaCompiler, FormulaSyntaxError
+from hardcoded_fields import HardcodeColumns
+
+
+@pytest.fixture
+def df_mapped():
+    return pd.DataFrame({
+        'Balance': ['10', '9', '2,5', None],
+        'Limit': ['9', '10', '1', '5'],
+        'Status': ['LIVE', 'live', 'Closed', None],
+        'Name': ['Ann', 'Bob', 'Cy', 'Di'],
+        'Start Date': ['2024-01-31', '2024-03-01', '2023-12-01', None],
+        'End Date': ['2024-02-01', '2024-02-01', '2024-01-01', '2024-01-01'],
+        'Rate': ['2.5', '-2.5', '2.675', '0.5'],
+    })
+
+
+def run(expression, df_mapped):
+    namespace = HardcodeColumns.formula_namespace(df_mapped)
+    exec(FormulaCompiler().compile(expression), namespace)
+    result = namespace['result']
+    return list(result) if np.ndim(result) else result
+
+
+def test_if_compares_two_columns_as_numbers(df_mapped):
+    result = run('=IF([Balance] > [Limit], "Over", "OK")', df_mapped)
+    assert result == ['Over', 'OK', 'OK', 'OK']
+
+
+def test_date_columns_are_ordered_chronologically(df_mapped):
+    assert run('[Start Date] < [End Date]', df_mapped) == [True, False, True, False]
+
+
+def test_text_comparison_ignores_case(df_mapped):
+    assert run('[Status]="LIVE"', df_mapped) == [True, True, False, False]
+    assert run('[Status]<>"live"', df_mapped) == [False, False, True, True]
+
+
+def test_round_halves_away_from_zero(df_mapped):
+    assert run('ROUND(2.5, 0)', df_mapped) == 3
+    assert run('ROUND(-2.5, 0)', df_mapped) == -3
+    assert run('ROUND(1250, -2)', df_mapped) == 1300
+    assert run('ROUND([Rate], 0)', df_mapped) == [3, -3, 3, 1]
+    assert run('ROUND([Rate], 2)', df_mapped)[2] == 2.68
+
+
+def test_and_or(df_mapped):
+    assert run('IF(AND([Limit] > 1, [Status] = "live"), 1, 0)', df_mapped) == [1, 1, 0, 0]
+    assert run('IF(OR([Limit] > 9, [Name] = "cy"), 1, 0)', df_mapped) == [0, 1, 1, 0]
+
+
+def test_isblank(df_mapped):
+    assert run('IF(ISBLANK([Status]), "blank", [Status])', df_mapped) == ['LIVE', 'live', 'Closed', 'blank']
+
+
+def test_concatenation(df_mapped):
+    assert run('[Name] & "-" & [Limit]', df_mapped) == ['Ann-9', 'Bob-10', 'Cy-1', 'Di-5']
+    assert run('"a" & "b" & [Name]', df_mapped) == ['abAnn', 'abBob', 'abCy', 'abDi']
+
+
+def test_unsupported_expression_is_left_to_the_llm():
+    with pytest.raises(FormulaSyntaxError):
+        FormulaCompiler().compile('VLOOKUP([Name], Sheet2!A:B, 2, FALSE)')
+
+
+def test_signed_literals(df_mapped):
+    assert run('-2^2', df_mapped) == 4
+    assert run('"x" & -2', df_mapped) == 'x-2'
+
+
+def test_blank_cells_are_empty_text(df_mapped):
+    assert run('[Name] & "-" & [Status]', df_mapped) == ['Ann-LIVE', 'Bob-live', 'Cy-Closed', 'Di-']
+    assert run('[Status]=""', df_mapped) == [False, False, False, True]
+
+
+def test_blank_cells_are_zero_in_numbers(df_mapped):
+    assert run('IF(OR([Balance]>6,[Balance]=0),"Ineligible","Eligible")', df_mapped) == [
+        'Ineligible', 'Ineligible', 'Eligible', 'Ineligible']
+    assert run('[Balance]*2', df_mapped)[3] == 0
+    # Text that is not a number is not blank
+    assert np.isnan(run('[Balance]*2', df_mapped)[2])
+    assert run('MIN([Balance], 5)', df_mapped) == [5, 5, 5, 5]
+
+
+def test_if_without_else_returns_false(df_mapped):
+    result = run('IF([Limit]>5, [Limit]*2)', df_mapped)
+    assert result[:2] == [18, 20]
+    assert result[2] is False and result[3] is False
@@ -0,0 +1,10 @@
+from hardcoded_fields import HardcodeColumns, MAX_COMPILED_FORMULAS
+
+
+def test_compiled_formulas_are_reused_and_bounded():
+    source = "result = df_mapped['MaxArrears'] * 2"
+    assert HardcodeColumns.compile_formula(source) is HardcodeColumns.compile_formula(source)
+
+    for number in range(MAX_COMPILED_FORMULAS + 10):
+        HardcodeColumns.compile_formula(f"result = {number}")
+    assert HardcodeColumns.compile_formula.cache_info().currsize == MAX_COMPILED_FORMULAS
@@ -0,0 +1,36 @@
+import pandas as pd
+from flter_columns import ColumnExtractor
+from lender_registry import get_registry
+
+
+def verdam_columns():
+    return get_registry().columns['verdam']
+
+
+def test_header_match_returns_the_header_spelling():
+    header = [column.upper() for column in verdam_columns()]
+    match = get_registry().match_header(header)
+    assert match.lender == 'verdam'
+    assert match.confidence == 1.0
+    assert match.columns == frozenset(header)
+
+
+def test_case_only_header_difference_keeps_every_column(tmp_path):
+    header = [column.upper() for column in verdam_columns()] + ['EXTRA']
+    raw_df = pd.DataFrame([[str(i) for i in range(len(header))]], columns=header)
+    path = tmp_path / 'tape.csv'
+    raw_df.to_csv(path, index=False)
+    standard_df = pd.DataFrame([{'Country': 'UK'}])
+
+    read_df = ColumnExtractor.read_useful_columns(str(path), 'tape.csv')
+    assert list(read_df.columns) == header[:-1]
+
+    useful, _ = ColumnExtractor(raw_df, standard_df, None).get_useful_columns('tape.csv')
+    assert list(useful.columns) == header[:-1]
+
+
+def test_lenders_without_a_loan_id_have_no_id_column():
+    id_columns = get_registry().id_columns
+    assert id_columns['verdam'] == 'UniqueLoanID'
+    assert id_columns['lantern'] is None
+    assert id_columns['barlowmarshall'] is None
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+from incremental import IncrementalStore
+from pipeline import DataPipeline
+
+
+@pytest.mark.parametrize('extra_columns', [True, False])
+def test_process_leaves_the_input_frame_unchanged(verdam_tape, standard_df, formulas_dict, extra_columns):
+    raw_df = verdam_tape()
+    if not extra_columns:
+        # Only the lender's columns, so extract selects the whole frame
+        raw_df = raw_df.drop(columns=['Extra'])
+    original = raw_df.copy()
+    pipeline = DataPipeline(standard_df, None, formulas_dict=formulas_dict)
+
+    first = pipeline.process(raw_df, 'verdam_2024.csv')
+    second = pipeline.process(raw_df, 'verdam_2024.csv')
+
+    assert raw_df.equals(original)
+    assert list(raw_df.columns) == list(original.columns)
+    assert first.equals(second)
+
+
+def test_streamed_output_matches_whole_tape(tmp_path, verdam_tape, standard_df, formulas_dict):
+    raw_df = verdam_tape(rows=100)
+    # Whole numbers with blanks in the middle of the tape only, so some chunks have none
+    raw_df['MaxArrears'] = raw_df['MaxArrears'].astype('Int64')
+    raw_df.loc[55:57, 'MaxArrears'] = pd.NA
+    raw_path = tmp_path / 'verdam_2024.csv'
+    raw_df.to_csv(raw_path, index=False)
+
+    whole = DataPipeline(standard_df, None, formulas_dict=formulas_dict)
+    streamed = DataPipeline(standard_df, None, formulas_dict=formulas_dict, chunksize=20)
+    whole.process_file(str(raw_path), str(tmp_path / 'whole.csv'))
+    streamed.process_file(str(raw_path), str(tmp_path / 'streamed.csv'))
+
+    assert (tmp_path / 'streamed.csv').read_text() == (tmp_path / 'whole.csv').read_text()
+
+
+@pytest.mark.parametrize('repeated_ids', [False, True])
+def test_repeated_ids_fall_back_to_a_full_run(tmp_path, verdam_tape, standard_df, formulas_dict, repeated_ids):
+    raw_df = verdam_tape()
+    if repeated_ids:
+        raw_df[' UniqueLoanID '] = raw_df[' UniqueLoanID '] // 2
+    raw_path = tmp_path / 'verdam_2024.csv'
+    raw_df.to_csv(raw_path, index=False)
+    state_dir = tmp_path / 'state'
+
+    incremental = DataPipeline(standard_df, None, formulas_dict=formulas_dict,
+                               state_store=IncrementalStore(str(state_dir)))
+    incremental.process_file(str(raw_path), str(tmp_path / 'incremental.csv'))
+    DataPipeline(standard_df, None, formulas_dict=formulas_dict).process_file(str(raw_path), str(tmp_path / 'full.csv'))
+
+    # Repeated ids cannot key the stored output, so no state is kept
+    assert bool(list(state_dir.iterdir())) is not repeated_ids
+    assert (tmp_path / 'incremental.csv').read_text() == (tmp_path / 'full.csv').read_text()